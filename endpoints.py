@@ -0,0 +1,361 @@
+"""
+Semantic Scholar API endpoints shared by the sync (search.py) and async (search_async.py) clients.
+
+Each *_call function describes one request as an ApiCall: URL, parameters, how to
+shape the response and what to return when it fails. BatchEndpoint does the same
+for the batch endpoints. Nothing here sends requests; the clients only differ in
+how they send these calls.
+"""
+
+import functools
+import itertools
+import logging
+import operator
+import sys
+from typing import Callable, List, Dict, Any, NamedTuple, Optional, Tuple
+
+# Base URL for the Semantic Scholar API
+BASE_URL = "https://api.semanticscholar.org/graph/v1"
+BASE_RECOMMENDATION_URL = "https://api.semanticscholar.org/recommendations/v1"
+
+# Endpoint URLs, built once; templates take the paper/author ID via str.format
+_PAPER_SEARCH_URL = BASE_URL + "/paper/search"
+_PAPER_MATCH_URL = BASE_URL + "/paper/search/match"
+_PAPER_AUTOCOMPLETE_URL = BASE_URL + "/paper/autocomplete"
+_PAPER_BATCH_URL = BASE_URL + "/paper/batch"
+_AUTHOR_SEARCH_URL = BASE_URL + "/author/search"
+_AUTHOR_BATCH_URL = BASE_URL + "/author/batch"
+_SNIPPET_SEARCH_URL = BASE_URL + "/snippet/search"
+_RECOMMENDATIONS_URL = BASE_RECOMMENDATION_URL + "/papers"
+_PAPER_URL = BASE_URL + "/paper/{}"
+_PAPER_CITATIONS_URL = BASE_URL + "/paper/{}/citations"
+_PAPER_REFERENCES_URL = BASE_URL + "/paper/{}/references"
+_AUTHOR_URL = BASE_URL + "/author/{}"
+_PAPER_RECOMMENDATIONS_URL = BASE_RECOMMENDATION_URL + "/papers/forpaper/{}"
+
+# API page and batch size limits
+MAX_SEARCH_LIMIT = 100
+MAX_SNIPPET_LIMIT = 1000
+MAX_RECOMMENDATION_LIMIT = 500
+MAX_PAPER_BATCH = 500
+MAX_AUTHOR_BATCH = 1000
+
+# Handlers and levels are left to the entry point
+logger = logging.getLogger(__name__)
+
+# Response schemas: the keys each endpoint's results are projected onto
+PAPER_SEARCH_FIELDS = (
+    "paperId", "title", "abstract", "year", "authors", "url", "venue", "publicationTypes",
+    "citationCount", "tldr"
+)
+PAPER_DETAIL_FIELDS = (
+    "paperId", "title", "abstract", "year", "authors", "url", "venue", "publicationTypes",
+    "citationCount", "referenceCount", "influentialCitationCount", "fieldsOfStudy",
+    "publicationDate", "tldr"
+)
+PAPER_MATCH_FIELDS = ("matchScore",) + PAPER_SEARCH_FIELDS
+CITED_PAPER_FIELDS = ("paperId", "title", "authors", "year", "venue")
+RECOMMENDED_PAPER_FIELDS = (
+    "paperId", "corpusId", "externalIds", "url", "title", "abstract", "venue", "publicationVenue",
+    "year", "referenceCount", "citationCount", "influentialCitationCount", "isOpenAccess",
+    "openAccessPdf", "fieldsOfStudy", "s2FieldsOfStudy", "publicationTypes", "publicationDate",
+    "journal", "citationStyles", "authors"
+)
+AUTHOR_FIELDS = ("authorId", "name", "url", "affiliations", "paperCount", "citationCount", "hIndex")
+AUTOCOMPLETE_FIELDS = ("id", "title", "authorsYear")
+SNIPPET_FIELDS = ("text", "snippetKind", "section", "snippetOffset")
+SNIPPET_PAPER_FIELDS = ("corpusId", "title", "authors")
+
+# Precomputed "fields" query values, built once at import instead of on every call
+_PAPER_SEARCH_FIELDS_STR = sys.intern(",".join(PAPER_SEARCH_FIELDS))
+_PAPER_DETAIL_FIELDS_STR = sys.intern(",".join(PAPER_DETAIL_FIELDS))
+_CITATION_FIELDS_STR = sys.intern("contexts,isInfluential,title,authors,year,venue")
+_AUTHOR_FIELDS_STR = sys.intern(",".join(AUTHOR_FIELDS))
+_SNIPPET_FIELDS_STR = sys.intern(",".join("snippet." + field for field in SNIPPET_FIELDS))
+_RECOMMENDED_PAPER_FIELDS_STR = sys.intern(",".join(RECOMMENDED_PAPER_FIELDS))
+
+def _clamp(limit: int, upper: int) -> int:
+    """Clamp a requested page size to the API's accepted range."""
+    return max(1, min(limit, upper))
+
+def take_ids(ids: List[str], limit: int, kind: str) -> List[str]:
+    """Take at most limit IDs in a single pass, warning when the rest are dropped."""
+    taken = list(itertools.islice(ids, limit))
+    if len(taken) == limit and len(ids) > limit:
+        logger.warning("%s IDs list truncated to %s items (API limit)", kind, limit)
+    return taken
+
+def chunked(ids: List[str], size: int) -> List[List[str]]:
+    """Split ids into consecutive lists of at most size items."""
+    return [ids[start:start + size] for start in range(0, len(ids), size)]
+
+def expand_batch(ids: List[str], unique_ids: List[str], results: List[Optional[Dict[str, Any]]],
+                  project: Callable[[Dict[str, Any]], Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Project batch results for unique_ids once each and lay them out in the order of ids, skipping unknown IDs."""
+    by_id = {item_id: project(item) for item_id, item in zip(unique_ids, results) if item}
+    return [by_id[item_id] for item_id in ids if item_id in by_id]
+
+def make_projector(fields: Tuple[str, ...], **transforms: Callable[[Any], Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Compile a function that copies fields out of a raw API object in order.
+
+    Missing fields become None; transforms maps a field name to a callable applied to its raw value.
+    The function is generated as a single dict literal with dict.get bound as a default argument,
+    so projecting large batches skips the per-field attribute lookups of a generic loop.
+    """
+    namespace: Dict[str, Any] = {"_g": dict.get}
+    params = ["o", "_g=_g"]
+    items = []
+    for field in fields:
+        value = f"_g(o, {field!r})"
+        if field in transforms:
+            name = f"_t{len(params)}"
+            namespace[name] = transforms[field]
+            params.append(f"{name}={name}")
+            value = f"{name}({value})"
+        items.append(f"{field!r}: {value}")
+    source = f"def _project({', '.join(params)}):\n    return {{{', '.join(items)}}}\n"
+    exec(source, namespace)
+    return namespace["_project"]
+
+_AUTHOR_GET = operator.itemgetter("name", "authorId")
+
+def _project_authors(authors: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Reduce an API author list to name/authorId pairs."""
+    try:
+        return [{"name": name, "authorId": author_id} for name, author_id in map(_AUTHOR_GET, authors or ())]
+    except KeyError:
+        # The API always sends both keys for nested authors; tolerate entries that don't
+        return [{"name": author.get("name"), "authorId": author.get("authorId")} for author in authors]
+
+def _project_tldr(tldr: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    return {"model": tldr.get("model", ""), "text": tldr.get("text", "")} if tldr else None
+
+# One compiled projector per response schema
+_project_search_paper = make_projector(PAPER_SEARCH_FIELDS, authors=_project_authors, tldr=_project_tldr)
+_project_paper_detail = make_projector(PAPER_DETAIL_FIELDS, authors=_project_authors, tldr=_project_tldr)
+_project_paper_match = make_projector(PAPER_MATCH_FIELDS, authors=_project_authors, tldr=_project_tldr)
+_project_cited_paper = make_projector(CITED_PAPER_FIELDS, authors=_project_authors)
+_project_recommended_paper = make_projector(RECOMMENDED_PAPER_FIELDS, authors=_project_authors)
+_project_author = make_projector(AUTHOR_FIELDS)
+_project_autocomplete = make_projector(AUTOCOMPLETE_FIELDS)
+_project_snippet_text = make_projector(SNIPPET_FIELDS)
+_project_snippet_paper = make_projector(SNIPPET_PAPER_FIELDS)
+
+def _project_edge(edge: Dict[str, Any], paper_key: str) -> Dict[str, Any]:
+    """Shape a citation (paper_key="citingPaper") or reference (paper_key="citedPaper") entry."""
+    return {
+        "contexts": edge.get("contexts", []),
+        "isInfluential": edge.get("isInfluential"),
+        paper_key: _project_cited_paper(edge.get(paper_key) or {})
+    }
+
+def _project_snippet(item: Dict[str, Any]) -> Dict[str, Any]:
+    paper = _project_snippet_paper(item.get("paper") or {})
+    paper["authors"] = paper["authors"] or []
+    return {
+        "score": item.get("score"),
+        "snippet": _project_snippet_text(item.get("snippet") or {}),
+        "paper": paper
+    }
+
+def _project_list(key: str, project: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable[[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Build a parser projecting each item of a response's key list."""
+    return lambda response_data: [project(item) for item in response_data.get(key, [])]
+
+def _parse_paper_match(response_data: Dict[str, Any]) -> Dict[str, Any]:
+    if response_data.get("data"):
+        paper = response_data["data"][0]  # Returns single best match
+        return _project_paper_match(paper)
+    return {"error": "No matching paper found"}
+
+# Response parsers shared by the sync and async clients
+_parse_search_papers = _project_list("data", _project_search_paper)
+_parse_citations = _project_list("data", functools.partial(_project_edge, paper_key="citingPaper"))
+_parse_references = _project_list("data", functools.partial(_project_edge, paper_key="citedPaper"))
+_parse_authors = _project_list("data", _project_author)
+_parse_autocomplete = _project_list("matches", _project_autocomplete)
+_parse_snippets = _project_list("data", _project_snippet)
+_parse_recommendations = _project_list("recommendedPapers", _project_recommended_paper)
+
+def _no_results(error: Exception) -> List[Dict[str, Any]]:
+    return []
+
+def _error_result(message: str) -> Callable[[Exception], Dict[str, str]]:
+    """Build a fallback returning {"error": "<message>: <error>"}."""
+    return lambda error: {"error": f"{message}: {error}"}
+
+_paper_details_error = _error_result("Failed to get paper details")
+_author_details_error = _error_result("Failed to get author details")
+_paper_match_error = _error_result("Failed to find paper match")
+
+class ApiCall(NamedTuple):
+    """
+    One endpoint call, built by the *_call functions below.
+
+    The sync and async clients only differ in how they send it: both shape the
+    response with parse and, on an expected API failure, log failure % failure_args
+    and return fallback(error).
+    """
+    url: str
+    params: Dict[str, Any]
+    parse: Callable[[Any], Any]
+    failure: str
+    failure_args: Tuple[Any, ...] = ()
+    fallback: Callable[[Exception], Any] = _no_results
+    json_data: Optional[Dict[str, Any]] = None
+    method: str = "GET"
+    cache: bool = False
+
+def call_failed(call: ApiCall, error: Exception) -> Any:
+    logger.error(call.failure + ": %s", *call.failure_args, error)
+    return call.fallback(error)
+
+def search_papers_call(query: str, limit: int) -> ApiCall:
+    params = {
+        "query": query,
+        "limit": _clamp(limit, MAX_SEARCH_LIMIT),
+        "fields": _PAPER_SEARCH_FIELDS_STR
+    }
+    return ApiCall(_PAPER_SEARCH_URL, params, _parse_search_papers, "Error searching papers")
+
+def paper_details_call(paper_id: str) -> ApiCall:
+    params = {
+        "fields": _PAPER_DETAIL_FIELDS_STR
+    }
+    return ApiCall(_PAPER_URL.format(paper_id), params, _project_paper_detail, "Error getting paper details for %s",
+                    (paper_id,), _paper_details_error, cache=True)
+
+def author_details_call(author_id: str) -> ApiCall:
+    params = {
+        "fields": _AUTHOR_FIELDS_STR
+    }
+    return ApiCall(_AUTHOR_URL.format(author_id), params, _project_author, "Error getting author details for %s",
+                    (author_id,), _author_details_error, cache=True)
+
+def paper_citations_call(paper_id: str, limit: int) -> ApiCall:
+    params = {
+        "limit": _clamp(limit, MAX_SEARCH_LIMIT),
+        "fields": _CITATION_FIELDS_STR
+    }
+    return ApiCall(_PAPER_CITATIONS_URL.format(paper_id), params, _parse_citations, "Error getting citations for %s",
+                    (paper_id,), cache=True)
+
+def paper_references_call(paper_id: str, limit: int) -> ApiCall:
+    params = {
+        "limit": _clamp(limit, MAX_SEARCH_LIMIT),
+        "fields": _CITATION_FIELDS_STR
+    }
+    return ApiCall(_PAPER_REFERENCES_URL.format(paper_id), params, _parse_references, "Error getting references for %s",
+                    (paper_id,), cache=True)
+
+def search_authors_call(query: str, limit: int) -> ApiCall:
+    params = {
+        "query": query,
+        "limit": _clamp(limit, MAX_SEARCH_LIMIT),
+        "fields": _AUTHOR_FIELDS_STR
+    }
+    return ApiCall(_AUTHOR_SEARCH_URL, params, _parse_authors, "Error searching authors")
+
+def paper_match_call(query: str) -> ApiCall:
+    params = {
+        "query": query,
+        "fields": _PAPER_SEARCH_FIELDS_STR
+    }
+    return ApiCall(_PAPER_MATCH_URL, params, _parse_paper_match, "Error finding paper match",
+                    fallback=_paper_match_error, cache=True)
+
+def paper_autocomplete_call(query: str) -> ApiCall:
+    params = {
+        "query": query[:100]  # API truncates to 100 characters
+    }
+    return ApiCall(_PAPER_AUTOCOMPLETE_URL, params, _parse_autocomplete, "Error getting autocomplete", cache=True)
+
+def search_snippets_call(query: str, limit: int) -> ApiCall:
+    params = {
+        "query": query,
+        "limit": _clamp(limit, MAX_SNIPPET_LIMIT),
+        "fields": _SNIPPET_FIELDS_STR
+    }
+    return ApiCall(_SNIPPET_SEARCH_URL, params, _parse_snippets, "Error searching snippets")
+
+def recommendations_from_lists_call(positive_paper_ids: List[str], negative_paper_ids: Optional[List[str]],
+                                     limit: int) -> ApiCall:
+    payload = {
+        "positivePaperIds": positive_paper_ids
+    }
+    if negative_paper_ids:
+        payload["negativePaperIds"] = negative_paper_ids
+    
+    params = {
+        "limit": _clamp(limit, MAX_RECOMMENDATION_LIMIT),
+        "fields": _RECOMMENDED_PAPER_FIELDS_STR
+    }
+    return ApiCall(_RECOMMENDATIONS_URL, params, _parse_recommendations,
+                    "Error getting paper recommendations from lists", json_data=payload, method="POST")
+
+def paper_recommendations_call(paper_id: str, limit: int) -> ApiCall:
+    params = {
+        "limit": _clamp(limit, MAX_RECOMMENDATION_LIMIT),
+        "fields": _RECOMMENDED_PAPER_FIELDS_STR
+    }
+    return ApiCall(_PAPER_RECOMMENDATIONS_URL.format(paper_id), params, _parse_recommendations,
+                    "Error getting paper recommendations for %s", (paper_id,))
+
+class BatchEndpoint(NamedTuple):
+    """
+    A batch endpoint with the fields requested from it and how its items are shaped.
+
+    details_call builds the single-ID request the batch stands in for; the coalesced
+    details lookups share its response cache entries.
+    """
+    url: str
+    fields: str
+    max_batch: int
+    project: Callable[[Dict[str, Any]], Dict[str, Any]]
+    kind: str
+    details_call: Callable[[str], ApiCall]
+
+PAPER_BATCH = BatchEndpoint(_PAPER_BATCH_URL, _PAPER_DETAIL_FIELDS_STR, MAX_PAPER_BATCH, _project_paper_detail, "paper",
+                            paper_details_call)
+AUTHOR_BATCH = BatchEndpoint(_AUTHOR_BATCH_URL, _AUTHOR_FIELDS_STR, MAX_AUTHOR_BATCH, _project_author, "author",
+                             author_details_call)
+
+def batch_request(ids: List[str], fields: str) -> Dict[str, Any]:
+    """Keyword arguments for the request posting ids to a batch endpoint."""
+    return {"params": {"fields": fields}, "json_data": {"ids": ids}, "method": "POST"}
+
+def check_batch_response(response_data: Any) -> List[Optional[Dict[str, Any]]]:
+    """Batch endpoints answer with a list lined up with the posted ids, with None for unknown IDs."""
+    if not isinstance(response_data, list):
+        raise ValueError(f"Unexpected batch response: {type(response_data).__name__}")
+    return response_data
+
+def batch_failed(endpoint: BatchEndpoint, error: Exception) -> List[Dict[str, Any]]:
+    logger.error("Error getting %ss batch: %s", endpoint.kind, error)
+    return []
+
+def chunk_failed(url: str, chunk: List[str], error: Exception) -> List[None]:
+    """Results for one failed chunk of a larger batch: its IDs are left out like unknown IDs."""
+    logger.error("Error getting batch chunk of %s IDs from %s: %s", len(chunk), url, error)
+    return [None] * len(chunk)
+
+class NotFound(dict):
+    """
+    Error result for an ID the API does not know.
+
+    Callers and JSON encoders see a plain {"error": ...} dict; the type only tells this
+    permanent miss apart from an error result for a failed request, which is worth retrying.
+    """
+
+def shape_details(endpoint: BatchEndpoint, items: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Shape batch items like the single-ID details endpoints, with a NotFound result for unknown IDs."""
+    not_found = f"Failed to get {endpoint.kind} details: {endpoint.kind} not found"
+    return [endpoint.project(item) if item else NotFound(error=not_found) for item in items]
+
+def details_failed(endpoint: BatchEndpoint, ids: List[str], error: Exception) -> List[Dict[str, Any]]:
+    logger.error("Error getting coalesced %s details: %s", endpoint.kind, error)
+    return [{"error": f"Failed to get {endpoint.kind} details: {error}"} for _ in ids]
+
+# Nested fields get the same normalization in column form as in get_papers_batch
+COLUMN_TRANSFORMS = {"authors": _project_authors, "tldr": _project_tldr}
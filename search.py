@@ -1,548 +1,647 @@
 import requests
+import functools
+import hashlib
+import itertools
+import json
+import os
+import queue
+import random
+import threading
 import time
 import logging
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
-# Base URL for the Semantic Scholar API
-BASE_URL = "https://api.semanticscholar.org/graph/v1"
-BASE_RECOMMENDATION_URL = "https://api.semanticscholar.org/recommendations/v1"
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader
+from urllib3.util.retry import Retry
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+try:
+    from orjson import dumps as _json_dumps, loads as _json_loads
+except ImportError:  # stdlib json also accepts the raw response bytes
+    from json import loads as _json_loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+try:
+    import diskcache
+except ImportError:  # Optional: only needed for the persistent cache
+    diskcache = None
+
+from endpoints import (
+    MAX_PAPER_BATCH, MAX_AUTHOR_BATCH, PAPER_BATCH, AUTHOR_BATCH, COLUMN_TRANSFORMS, ApiCall, BatchEndpoint,
+    call_failed, take_ids, chunked, expand_batch, batch_request, check_batch_response, batch_failed, chunk_failed,
+    shape_details, details_failed, search_papers_call, paper_details_call, author_details_call,
+    paper_citations_call, paper_references_call, search_authors_call, paper_match_call, paper_autocomplete_call,
+    search_snippets_call, recommendations_from_lists_call, paper_recommendations_call
+)
+
+# Retry policy: attempts after the first, base delay for exponential backoff,
+# and upper bound for a single retry sleep (seconds)
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_BACKOFF = 60.0
+
+# Batch endpoints have their own, smaller rate bucket, so at most this many batch POSTs are in flight
+MAX_BATCH_CONCURRENCY = int(os.getenv("S2_MAX_BATCH_CONCURRENCY", "2"))
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Failures an endpoint turns into an empty/error result: transport and HTTP errors,
+# undecodable bodies (JSON decode errors are ValueErrors) and unexpected payload shapes.
+# Anything else is a bug and propagates.
+_API_ERRORS = (requests.RequestException, ValueError, KeyError)
+
+# Optional API key for higher rate limits (https://www.semanticscholar.org/product/api)
+API_KEY = os.getenv("SEMANTIC_SCHOLAR_API_KEY")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "semantic-scholar-graph-api/1.0.0",
+    "Accept": "application/json",
+}
+if API_KEY:
+    DEFAULT_HEADERS["x-api-key"] = API_KEY
+
+# POST bodies are pre-encoded to bytes, so the content type has to be set explicitly
+JSON_BODY_HEADERS = {"Content-Type": "application/json"}
+
+# Proactive client-side rate limit in requests per minute, spaced evenly instead of sent in bursts.
+# Keyed requests get 1 request/second. Unauthenticated traffic shares a pool of 5,000 requests
+# per 5 minutes with every other anonymous client, so one client only takes a small share of it.
+RATE_LIMIT_RPM = int(os.getenv("S2_RATE_LIMIT_RPM", "60" if API_KEY else "100"))
+
+# Response cache settings (read-only endpoints only)
+CACHE_TTL = float(os.getenv("S2_CACHE_TTL", "86400"))
+CACHE_MAXSIZE = int(os.getenv("S2_CACHE_SIZE", "4096"))
+CACHE_DIR = os.getenv("S2_CACHE_DIR")
+
+# Handlers and levels are left to the entry point (server.py configures them)
 logger = logging.getLogger(__name__)
 
+class RateLimiter:
+    """
+    Sliding-window rate limiter allowing at most max_calls sends per period seconds.
+    
+    Callers reserve a send slot before each request instead of waiting for a 429.
+    reserve() only computes the wait, so the same limiter serves both the blocking
+    client (acquire) and the async client (await asyncio.sleep(reserve())).
+    """
+    
+    def __init__(self, max_calls: int, period: float = 60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._sends: deque = deque()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """Reserve the next send slot and return how many seconds to wait before using it."""
+        if self.max_calls <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            while self._sends and self._sends[0] <= now - self.period:
+                self._sends.popleft()
+            send_at = max(now, self._blocked_until)
+            if len(self._sends) >= self.max_calls:
+                send_at = max(send_at, self._sends[-self.max_calls] + self.period)
+            self._sends.append(send_at)
+            return send_at - now
+    
+    @classmethod
+    def spaced(cls, per_minute: int) -> "RateLimiter":
+        """A limiter allowing one send every 60/per_minute seconds, so sends never burst; 0 disables it."""
+        if per_minute <= 0:
+            return cls(0)
+        return cls(1, period=60.0 / per_minute)
+    
+    def acquire(self) -> None:
+        """Block until a send slot is available."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+    
+    def pause(self, seconds: float) -> None:
+        """Hold back every new send for the given number of seconds."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+    
+    def update_from_headers(self, headers: Any) -> None:
+        """Tighten the window when the server reports the quota as exhausted."""
+        if headers.get("x-ratelimit-remaining") == "0":
+            try:
+                self.pause(float(headers.get("x-ratelimit-reset", self.period)))
+            except ValueError:
+                self.pause(self.period)
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency gate for blocking callers.
+    
+    The limit grows additively after each successful response and shrinks
+    multiplicatively on 429/5xx, so parallel callers back off as a group.
+    """
+    
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32,
+                 increase: float = 0.5, decrease: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self._in_flight = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+    
+    def release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+    
+    def record(self, throttled: bool) -> None:
+        """Adjust the limit from the outcome of a completed request."""
+        with self._condition:
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase)
+            self._condition.notify_all()
+
+_RATE_LIMITER = RateLimiter.spaced(RATE_LIMIT_RPM)
+_CONCURRENCY = AIMDLimiter()
+
+class _LoggingRetry(Retry):
+    """
+    urllib3 Retry using the client's full-jitter backoff.
+    
+    Every retry is logged and fed back into the client-side rate limiter and
+    concurrency gate, and retried sends wait for a rate limiter slot like first sends.
+    """
+    
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response=response, error=error,
+                                      _pool=_pool, _stacktrace=_stacktrace)
+        attempt = len(new_retry.history)
+        if response is not None:
+            _CONCURRENCY.record(throttled=True)
+            if response.status == 429:
+                # Hold back other callers too instead of letting them hit the same 429
+                _RATE_LIMITER.pause(new_retry.get_retry_after(response) or new_retry.get_backoff_time())
+            logger.warning("HTTP %s for %s. Retrying... (attempt %s/%s)", response.status, url, attempt, MAX_RETRIES)
+        else:
+            logger.warning("Request failed: %s. Retrying... (attempt %s/%s)", error, attempt, MAX_RETRIES)
+        return new_retry
+    
+    def get_retry_after(self, response) -> Optional[float]:
+        # A malformed Retry-After header should fall back to backoff, not fail the request
+        try:
+            return super().get_retry_after(response)
+        except InvalidHeader:
+            return None
+    
+    def get_backoff_time(self) -> float:
+        if not self.history:
+            return 0.0
+        return _backoff_delay(len(self.history) - 1, self.backoff_factor)
+    
+    def sleep(self, response=None) -> None:
+        super().sleep(response)
+        _RATE_LIMITER.acquire()
+
+def _create_retry() -> Retry:
+    return _LoggingRetry(
+        total=MAX_RETRIES,
+        backoff_factor=BASE_DELAY,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        # Hand back the last response so raise_for_status reports the real status
+        raise_on_status=False,
+    )
+
+def _create_session() -> requests.Session:
+    """Create a pooled session so repeated calls reuse keep-alive connections."""
+    session = requests.Session()
+    # 429/5xx, timeouts and connection errors are retried inside urllib3. Every request passes
+    # the concurrency gate first, so a pool of its maximum size never has to discard a connection.
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_CONCURRENCY.maximum, max_retries=_create_retry())
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+# Shared session for all Semantic Scholar API calls
+_SESSION = _create_session()
+
+def close_session() -> None:
+    """Close the shared HTTP session and release pooled connections."""
+    _SESSION.close()
+
+# In-process LRU, optionally backed by an on-disk cache. Entries are (expires_at, payload, validators);
+# validators holds the conditional request headers built from the response's ETag/Last-Modified, if it sent any
+_CacheEntry = Tuple[float, Any, Optional[Dict[str, str]]]
+_memory_cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+_memory_cache_lock = threading.Lock()
+_disk_cache = None
+if CACHE_DIR:
+    if diskcache is not None:
+        _disk_cache = diskcache.Cache(CACHE_DIR)
+    else:
+        logger.warning("S2_CACHE_DIR is set but diskcache is not installed; using in-memory cache only")
+
+def _cache_key(method: str, url: str, params: Optional[Dict], json_data: Optional[Dict]) -> str:
+    """Hash the request parameters into a compact, order-independent cache key."""
+    raw = json.dumps((method.upper(), url, params, json_data), sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+def _validators(headers: Any) -> Optional[Dict[str, str]]:
+    """Build If-None-Match/If-Modified-Since headers from a response's ETag/Last-Modified."""
+    validators = {}
+    etag = headers.get("ETag")
+    if etag:
+        validators["If-None-Match"] = etag
+    last_modified = headers.get("Last-Modified")
+    if last_modified:
+        validators["If-Modified-Since"] = last_modified
+    return validators or None
+
+def _memory_cache_set(key: str, entry: _CacheEntry) -> None:
+    if CACHE_MAXSIZE <= 0:
+        return
+    with _memory_cache_lock:
+        _memory_cache[key] = entry
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > CACHE_MAXSIZE:
+            _memory_cache.popitem(last=False)
+
+def _cache_get(key: str, disk: bool = True) -> Optional[_CacheEntry]:
+    """
+    Return the cache entry for key, or None.
+
+    Expired entries are still returned when they carry validators, so the caller
+    can revalidate them with a conditional request instead of refetching the body.
+    With disk=False only the in-memory cache is consulted, which never blocks on I/O.
+    """
+    now = time.time()
+    with _memory_cache_lock:
+        entry = _memory_cache.get(key)
+        if entry is not None:
+            if entry[0] > now or entry[2]:
+                _memory_cache.move_to_end(key)
+                return entry
+            del _memory_cache[key]
+    
+    if disk and _disk_cache is not None:
+        entry = _disk_cache.get(key)
+        if entry is not None and (entry[0] > now or entry[2]):
+            _memory_cache_set(key, entry)
+            return entry
+    return None
+
+def _cache_set(key: str, payload: Any, validators: Optional[Dict[str, str]] = None) -> None:
+    """Store (or renew) a successful response payload in the cache."""
+    if CACHE_TTL <= 0:
+        return
+    entry = (time.time() + CACHE_TTL, payload, validators)
+    _memory_cache_set(key, entry)
+    if _disk_cache is not None:
+        # Revalidatable entries outlive the TTL on disk; the rest can simply expire
+        _disk_cache.set(key, entry, expire=None if validators else CACHE_TTL)
+
+def _cache_set_many(entries: List[Tuple[str, Any]]) -> None:
+    """_cache_set for several (key, payload) pairs without validators."""
+    for key, payload in entries:
+        _cache_set(key, payload)
+
+def api_cache_clear() -> None:
+    """Clear both the in-process and the on-disk response caches."""
+    with _memory_cache_lock:
+        _memory_cache.clear()
+    if _disk_cache is not None:
+        _disk_cache.clear()
+
+def _backoff_delay(attempt: int, base_delay: float) -> float:
+    """Exponential backoff with full jitter, capped at MAX_BACKOFF."""
+    return random.uniform(0, min(MAX_BACKOFF, base_delay * (2 ** attempt)))
+
+def _retry_after(headers: Any, default: float) -> float:
+    """Return the server's Retry-After delay in seconds, or default if absent/unparseable."""
+    try:
+        return float(headers.get("Retry-After", default))
+    except ValueError:
+        # Retry-After may also be an HTTP date; fall back to our own backoff
+        return default
+
+def _send(method: str, url: str, params: Optional[Dict], json_data: Optional[Dict],
+          headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """Send one request through the rate limiter and the adaptive concurrency gate."""
+    if method.upper() not in ("GET", "POST"):
+        raise ValueError(f"Unsupported HTTP method: {method}")
+    
+    _RATE_LIMITER.acquire()
+    _CONCURRENCY.acquire()
+    try:
+        if method.upper() == "GET":
+            response = _SESSION.get(url, params=params, headers=headers, timeout=30)
+        else:
+            response = _SESSION.post(url, params=params, data=_json_dumps(json_data),
+                                     headers=JSON_BODY_HEADERS, timeout=30)
+    finally:
+        _CONCURRENCY.release()
+    
+    _CONCURRENCY.record(throttled=response.status_code == 429 or response.status_code >= 500)
+    _RATE_LIMITER.update_from_headers(response.headers)
+    return response
+
 def make_request_with_retry(url: str, params: Optional[Dict] = None, json_data: Optional[Dict] = None, 
-                           method: str = "GET", max_retries: int = 5, base_delay: float = 1.0) -> Dict[str, Any]:
+                           method: str = "GET", cache: bool = False) -> Dict[str, Any]:
     """
-    Make HTTP request with retry logic for 429 rate limit errors.
+    Make an HTTP request to the Semantic Scholar API.
+    
+    Rate limiting (429), transient server errors, timeouts and connection errors
+    are retried by the session's urllib3 Retry policy with jittered exponential
+    backoff, honoring Retry-After.
     
     Args:
         url: The URL to make the request to
         params: Query parameters for GET requests
         json_data: JSON data for POST requests
         method: HTTP method (GET or POST)
-        max_retries: Maximum number of retry attempts
-        base_delay: Base delay in seconds, will be exponentially increased
+        cache: Serve from and store into the response cache (read-only endpoints only)
     
     Returns:
         JSON response as dictionary
     
     Raises:
-        Exception: If all retries are exhausted or other errors occur
+        requests.exceptions.RequestException: If the request fails or retries are exhausted
     """
+    cache_key = _cache_key(method, url, params, json_data) if cache else None
+    entry = _cache_get(cache_key) if cache_key is not None else None
+    if entry is not None and entry[0] > time.time():
+        return entry[1]
     
-    for attempt in range(max_retries + 1):
-        try:
-            if method.upper() == "GET":
-                response = requests.get(url, params=params, timeout=30)
-            elif method.upper() == "POST":
-                response = requests.post(url, params=params, json=json_data, timeout=30)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            # Check if request was successful
-            if response.status_code == 200:
-                return response.json()
-            
-            # Handle rate limiting (429 Too Many Requests)
-            elif response.status_code == 429:
-                if attempt < max_retries:
-                    # Exponential backoff with jitter
-                    delay = base_delay * (2 ** attempt)
-                    logger.warning(f"Rate limit hit (429). Retrying in {delay} seconds... (attempt {attempt + 1}/{max_retries + 1})")
-                    time.sleep(delay)
-                    continue
-                else:
-                    raise Exception(f"Rate limit exceeded. Max retries ({max_retries}) exhausted.")
-            
-            # Handle other HTTP errors
-            else:
-                response.raise_for_status()
-                
-        except requests.exceptions.Timeout:
-            if attempt < max_retries:
-                delay = base_delay * (2 ** attempt)
-                logger.warning(f"Request timeout. Retrying in {delay} seconds... (attempt {attempt + 1}/{max_retries + 1})")
-                time.sleep(delay)
-                continue
-            else:
-                raise Exception("Request timeout. Max retries exhausted.")
-        
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries:
-                delay = base_delay * (2 ** attempt)
-                logger.warning(f"Request failed: {e}. Retrying in {delay} seconds... (attempt {attempt + 1}/{max_retries + 1})")
-                time.sleep(delay)
-                continue
-            else:
-                raise Exception(f"Request failed after {max_retries} retries: {e}")
+    # A stale entry is only returned when it has validators, so this is a conditional request
+    response = _send(method, url, params, json_data, headers=entry[2] if entry is not None else None)
+    if response.status_code == 304 and entry is not None:
+        # Unchanged upstream: renew the entry without downloading or parsing a body
+        _cache_set(cache_key, entry[1], entry[2])
+        return entry[1]
+    response.raise_for_status()
     
-    raise Exception("Unexpected error in request retry logic")
+    payload = _json_loads(response.content)
+    if cache_key is not None:
+        _cache_set(cache_key, payload, _validators(response.headers))
+    return payload
+
+def _details_cache_key(endpoint: BatchEndpoint, item_id: str) -> str:
+    """Response cache key of the single-ID details request for item_id."""
+    call = endpoint.details_call(item_id)
+    return _cache_key(call.method, call.url, call.params, call.json_data)
+
+def _details_cache_entries(endpoint: BatchEndpoint, ids: List[str],
+                           items: List[Optional[Dict[str, Any]]]) -> List[Tuple[str, Any]]:
+    """Pair each found batch item with its single-ID cache key, so batched lookups fill the response cache."""
+    return [(_details_cache_key(endpoint, item_id), item) for item_id, item in zip(ids, items) if item]
+
+def _call(call: ApiCall) -> Any:
+    """Send call and shape its response, or its fallback result on an expected API failure."""
+    try:
+        response_data = make_request_with_retry(call.url, params=call.params, json_data=call.json_data,
+                                                method=call.method, cache=call.cache)
+        return call.parse(response_data)
+    except _API_ERRORS as e:
+        return call_failed(call, e)
 
 def search_papers(query: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Search for papers using a query string."""
-    url = f"{BASE_URL}/paper/search"
-    params = {
-        "query": query,
-        "limit": min(limit, 100),  # API limit is 100
-        "fields": "paperId,title,abstract,year,authors,url,venue,publicationTypes,citationCount,tldr"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params)
-        papers = response_data.get("data", [])
-        
-        return [
-            {
-                "paperId": paper.get("paperId"),
-                "title": paper.get("title"),
-                "abstract": paper.get("abstract"),
-                "year": paper.get("year"),
-                "authors": [{"name": author.get("name"), "authorId": author.get("authorId")} 
-                           for author in paper.get("authors", [])],
-                "url": paper.get("url"),
-                "venue": paper.get("venue"),
-                "publicationTypes": paper.get("publicationTypes"),
-                "citationCount": paper.get("citationCount"),
-                "tldr": {
-                    "model": paper.get("tldr", {}).get("model", ""),
-                    "text": paper.get("tldr", {}).get("text", "")
-                } if paper.get("tldr") else None
-            } for paper in papers
-        ]
-    except Exception as e:
-        logger.error(f"Error searching papers: {e}")
-        return []
+    return _call(search_papers_call(query, limit))
 
 def get_paper_details(paper_id: str) -> Dict[str, Any]:
     """Get details of a specific paper."""
-    url = f"{BASE_URL}/paper/{paper_id}"
-    params = {
-        "fields": "paperId,title,abstract,year,authors,url,venue,publicationTypes,citationCount,referenceCount,influentialCitationCount,fieldsOfStudy,publicationDate,tldr"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params)
-        return {
-            "paperId": response_data.get("paperId"),
-            "title": response_data.get("title"),
-            "abstract": response_data.get("abstract"),
-            "year": response_data.get("year"),
-            "authors": [{"name": author.get("name"), "authorId": author.get("authorId")} 
-                       for author in response_data.get("authors", [])],
-            "url": response_data.get("url"),
-            "venue": response_data.get("venue"),
-            "publicationTypes": response_data.get("publicationTypes"),
-            "citationCount": response_data.get("citationCount"),
-            "referenceCount": response_data.get("referenceCount"),
-            "influentialCitationCount": response_data.get("influentialCitationCount"),
-            "fieldsOfStudy": response_data.get("fieldsOfStudy"),
-            "publicationDate": response_data.get("publicationDate"),
-            "tldr": {
-                    "model": response_data.get("tldr", {}).get("model", ""),
-                    "text": response_data.get("tldr", {}).get("text", "")
-                } if response_data.get("tldr") else None
-        }
-    except Exception as e:
-        logger.error(f"Error getting paper details for {paper_id}: {e}")
-        return {"error": f"Failed to get paper details: {e}"}
+    return _call(paper_details_call(paper_id))
 
 def get_author_details(author_id: str) -> Dict[str, Any]:
     """Get details of a specific author."""
-    url = f"{BASE_URL}/author/{author_id}"
-    params = {
-        "fields": "authorId,name,url,affiliations,paperCount,citationCount,hIndex"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params)
-        return {
-            "authorId": response_data.get("authorId"),
-            "name": response_data.get("name"),
-            "url": response_data.get("url"),
-            "affiliations": response_data.get("affiliations"),
-            "paperCount": response_data.get("paperCount"),
-            "citationCount": response_data.get("citationCount"),
-            "hIndex": response_data.get("hIndex")
-        }
-    except Exception as e:
-        logger.error(f"Error getting author details for {author_id}: {e}")
-        return {"error": f"Failed to get author details: {e}"}
+    return _call(author_details_call(author_id))
 
 def get_paper_citations(paper_id: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Get citations for a specific paper."""
-    url = f"{BASE_URL}/paper/{paper_id}/citations"
-    params = {
-        "limit": min(limit, 100),  # API limit is 100
-        "fields": "contexts,isInfluential,title,authors,year,venue"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params)
-        citations = response_data.get("data", [])
-        
-        return [
-            {
-                "contexts": citation.get("contexts", []),
-                "isInfluential": citation.get("isInfluential"),
-                "citingPaper": {
-                    "paperId": citation.get("citingPaper", {}).get("paperId"),
-                    "title": citation.get("citingPaper", {}).get("title"),
-                    "authors": [{"name": author.get("name"), "authorId": author.get("authorId")} 
-                               for author in citation.get("citingPaper", {}).get("authors", [])],
-                    "year": citation.get("citingPaper", {}).get("year"),
-                    "venue": citation.get("citingPaper", {}).get("venue")
-                }
-            } for citation in citations
-        ]
-    except Exception as e:
-        logger.error(f"Error getting citations for {paper_id}: {e}")
-        return []
+    return _call(paper_citations_call(paper_id, limit))
 
 def get_paper_references(paper_id: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Get references for a specific paper."""
-    url = f"{BASE_URL}/paper/{paper_id}/references"
-    params = {
-        "limit": min(limit, 100),  # API limit is 100
-        "fields": "contexts,isInfluential,title,authors,year,venue"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params)
-        references = response_data.get("data", [])
-        
-        return [
-            {
-                "contexts": reference.get("contexts", []),
-                "isInfluential": reference.get("isInfluential"),
-                "citedPaper": {
-                    "paperId": reference.get("citedPaper", {}).get("paperId"),
-                    "title": reference.get("citedPaper", {}).get("title"),
-                    "authors": [{"name": author.get("name"), "authorId": author.get("authorId")} 
-                               for author in reference.get("citedPaper", {}).get("authors", [])],
-                    "year": reference.get("citedPaper", {}).get("year"),
-                    "venue": reference.get("citedPaper", {}).get("venue")
-                }
-            } for reference in references
-        ]
-    except Exception as e:
-        logger.error(f"Error getting references for {paper_id}: {e}")
-        return []
+    return _call(paper_references_call(paper_id, limit))
+
+# Shared pool for overlapping independent blocking calls, reused across invocations
+_FANOUT_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="s2-fanout")
 
 def get_citations_and_references(paper_id: str) -> Dict[str, List[Dict[str, Any]]]:
-    """Get citations and references for a paper using paper ID."""
-    citations = get_paper_citations(paper_id)
-    references = get_paper_references(paper_id)
+    """Get citations and references for a paper using paper ID, fetching both concurrently."""
+    citations = _FANOUT_EXECUTOR.submit(get_paper_citations, paper_id)
+    references = _FANOUT_EXECUTOR.submit(get_paper_references, paper_id)
     
     return {
-        "citations": citations,
-        "references": references
+        "citations": citations.result(),
+        "references": references.result()
     }
 
 def search_authors(query: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Search for authors using a query string."""
-    url = f"{BASE_URL}/author/search"
-    params = {
-        "query": query,
-        "limit": min(limit, 100),  # API limit is 100
-        "fields": "authorId,name,url,affiliations,paperCount,citationCount,hIndex"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params)
-        authors = response_data.get("data", [])
-        
-        return [
-            {
-                "authorId": author.get("authorId"),
-                "name": author.get("name"),
-                "url": author.get("url"),
-                "affiliations": author.get("affiliations"),
-                "paperCount": author.get("paperCount"),
-                "citationCount": author.get("citationCount"),
-                "hIndex": author.get("hIndex")
-            } for author in authors
-        ]
-    except Exception as e:
-        logger.error(f"Error searching authors: {e}")
-        return []
+    return _call(search_authors_call(query, limit))
 
 def search_paper_match(query: str) -> Dict[str, Any]:
     """Find the best matching paper using title-based search."""
-    url = f"{BASE_URL}/paper/search/match"
-    params = {
-        "query": query,
-        "fields": "paperId,title,abstract,year,authors,url,venue,publicationTypes,citationCount,tldr"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params)
-        if response_data.get("data"):
-            paper = response_data["data"][0]  # Returns single best match
-            return {
-                "matchScore": paper.get("matchScore"),
-                "paperId": paper.get("paperId"),
-                "title": paper.get("title"),
-                "abstract": paper.get("abstract"),
-                "year": paper.get("year"),
-                "authors": [{"name": author.get("name"), "authorId": author.get("authorId")} 
-                           for author in paper.get("authors", [])],
-                "url": paper.get("url"),
-                "venue": paper.get("venue"),
-                "publicationTypes": paper.get("publicationTypes"),
-                "citationCount": paper.get("citationCount"),
-                "tldr": {
-                    "model": paper.get("tldr", {}).get("model", ""),
-                    "text": paper.get("tldr", {}).get("text", "")
-                } if paper.get("tldr") else None
-            }
-        else:
-            return {"error": "No matching paper found"}
-    except Exception as e:
-        logger.error(f"Error finding paper match: {e}")
-        return {"error": f"Failed to find paper match: {e}"}
+    return _call(paper_match_call(query))
 
 def get_paper_autocomplete(query: str) -> List[Dict[str, Any]]:
     """Get paper title autocompletion suggestions."""
-    url = f"{BASE_URL}/paper/autocomplete"
-    params = {
-        "query": query[:100]  # API truncates to 100 characters
-    }
+    return _call(paper_autocomplete_call(query))
+
+_BATCH_GATE = threading.BoundedSemaphore(MAX_BATCH_CONCURRENCY)
+
+def _fetch_batch(url: str, ids: List[str], fields: str) -> List[Optional[Dict[str, Any]]]:
+    """POST IDs to a batch endpoint. Results line up with ids, with None for unknown IDs."""
+    with _BATCH_GATE:
+        response_data = make_request_with_retry(url, **batch_request(ids, fields))
+    return check_batch_response(response_data)
+
+def _fetch_chunk(url: str, chunk: List[str], fields: str) -> List[Optional[Dict[str, Any]]]:
+    try:
+        return _fetch_batch(url, chunk, fields)
+    except _API_ERRORS as e:
+        return chunk_failed(url, chunk, e)
+
+# Chunks of large batch lists, on their own pool so they never queue behind (or hold up)
+# _FANOUT_EXECUTOR jobs while waiting for a _BATCH_GATE slot
+_BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_BATCH_CONCURRENCY, thread_name_prefix="s2-batch")
+
+def _fetch_batch_chunked(url: str, ids: List[str], fields: str, chunk_size: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    _fetch_batch for any number of IDs: larger lists are split into endpoint-sized chunks.
+
+    Chunks are fetched concurrently, each taking its own _BATCH_GATE slot, so a huge list
+    queues behind MAX_BATCH_CONCURRENCY in-flight requests instead of sending them all at once.
+    A chunk whose request fails gets None for each of its IDs; the other chunks are kept.
+    """
+    chunks = chunked(ids, chunk_size)
+    if len(chunks) <= 1:
+        return _fetch_batch(url, ids, fields)
+    results = _BATCH_EXECUTOR.map(lambda chunk: _fetch_chunk(url, chunk, fields), chunks)
+    return list(itertools.chain.from_iterable(results))
+
+def _get_batch(endpoint: BatchEndpoint, ids: List[str]) -> List[Dict[str, Any]]:
+    """Fetch each distinct ID once, in endpoint-sized chunks, and lay the results out in the order of ids."""
+    unique_ids = list(dict.fromkeys(ids))
     
     try:
-        response_data = make_request_with_retry(url, params=params)
-        matches = response_data.get("matches", [])
-        
-        return [
-            {
-                "id": match.get("id"),
-                "title": match.get("title"),
-                "authorsYear": match.get("authorsYear")
-            } for match in matches
-        ]
-    except Exception as e:
-        logger.error(f"Error getting autocomplete: {e}")
-        return []
+        items = _fetch_batch_chunked(endpoint.url, unique_ids, endpoint.fields, endpoint.max_batch)
+        return expand_batch(ids, unique_ids, items, endpoint.project)
+    except _API_ERRORS as e:
+        return batch_failed(endpoint, e)
 
 def get_papers_batch(paper_ids: List[str]) -> List[Dict[str, Any]]:
-    """Get details for multiple papers using batch API."""
-    url = f"{BASE_URL}/paper/batch"
-    
-    # API limit is 500 papers at a time
-    if len(paper_ids) > 500:
-        paper_ids = paper_ids[:500]
-        logger.warning(f"Paper IDs list truncated to 500 items (API limit)")
-    
-    params = {
-        "fields": "paperId,title,abstract,year,authors,url,venue,publicationTypes,citationCount,referenceCount,influentialCitationCount,fieldsOfStudy,publicationDate,tldr"
-    }
-    
-    json_data = {"ids": paper_ids}
+    """Get details for multiple papers using batch API, in parallel chunks of up to 500 IDs."""
+    return _get_batch(PAPER_BATCH, paper_ids)
+
+
+def get_papers_batch_columns(paper_ids: List[str], fields: Tuple[str, ...] = ("paperId", "title")) -> Dict[str, List[Any]]:
+    """
+    Get selected fields for multiple papers as parallel columns.
+
+    Only the requested fields are fetched, and the result is {field: [value per paper]}
+    instead of one dict per paper: K lists of length N rather than N dicts with K keys,
+    which is much lighter for large batches when callers only need a few columns.
+    Every column has one slot per (possibly truncated) input ID, in input order, so
+    columns[field][i] belongs to paper_ids[i]; unknown paper IDs get None in every
+    column. If the request fails, every column is empty.
+    """
+    paper_ids = take_ids(paper_ids, MAX_PAPER_BATCH, "Paper")
     
     try:
-        response_data = make_request_with_retry(url, params=params, json_data=json_data, method="POST")
-        if isinstance(response_data, list):
-            return [
-                {
-                    "paperId": paper.get("paperId"),
-                    "title": paper.get("title"),
-                    "abstract": paper.get("abstract"),
-                    "year": paper.get("year"),
-                    "authors": [{"name": author.get("name"), "authorId": author.get("authorId")} 
-                               for author in paper.get("authors", [])],
-                    "url": paper.get("url"),
-                    "venue": paper.get("venue"),
-                    "publicationTypes": paper.get("publicationTypes"),
-                    "citationCount": paper.get("citationCount"),
-                    "referenceCount": paper.get("referenceCount"),
-                    "influentialCitationCount": paper.get("influentialCitationCount"),
-                    "fieldsOfStudy": paper.get("fieldsOfStudy"),
-                    "publicationDate": paper.get("publicationDate"),
-                    "tldr": {
-                        "model": paper.get("tldr", {}).get("model", ""),
-                        "text": paper.get("tldr", {}).get("text", "")
-                    } if paper.get("tldr") else None
-                } for paper in response_data if paper  # Filter out None entries
-            ]
+        papers = _fetch_batch(PAPER_BATCH.url, paper_ids, ",".join(fields))
+    except _API_ERRORS as e:
+        logger.error("Error getting papers batch columns: %s", e)
+        papers = []
+    
+    columns = {}
+    for field in fields:
+        transform = COLUMN_TRANSFORMS.get(field)
+        if transform:
+            columns[field] = [transform(paper.get(field)) if paper else None for paper in papers]
         else:
-            return []
-    except Exception as e:
-        logger.error(f"Error getting papers batch: {e}")
-        return []
+            columns[field] = [paper.get(field) if paper else None for paper in papers]
+    return columns
 
 def get_authors_batch(author_ids: List[str]) -> List[Dict[str, Any]]:
-    """Get details for multiple authors using batch API."""
-    url = f"{BASE_URL}/author/batch"
+    """Get details for multiple authors using batch API, in parallel chunks of up to 1000 IDs."""
+    return _get_batch(AUTHOR_BATCH, author_ids)
+
+class BatchCoalescer:
+    """
+    Coalesces single-ID lookups into batch endpoint calls.
     
-    # API limit is 1000 authors at a time
-    if len(author_ids) > 1000:
-        author_ids = author_ids[:1000]
-        logger.warning(f"Author IDs list truncated to 1000 items (API limit)")
+    IDs submitted within max_wait seconds of the first pending one (or until
+    max_batch IDs are queued) are resolved by a background thread with a
+    single call to fetch_batch, which must return results aligned with its input.
+    """
     
-    params = {
-        "fields": "authorId,name,url,affiliations,paperCount,citationCount,hIndex"
-    }
+    def __init__(self, fetch_batch: Callable[[List[str]], List[Dict[str, Any]]], max_batch: int,
+                 max_wait: float = 0.02, name: str = "s2-batch"):
+        self.fetch_batch = fetch_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+    
+    def submit(self, item_id: str) -> Future:
+        """Queue an ID and return a Future resolved with its result."""
+        future: Future = Future()
+        self._queue.put((item_id, future))
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+        return future
     
-    json_data = {"ids": author_ids}
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(pending)
     
+    def _flush(self, pending: List[Tuple[str, Future]]) -> None:
+        pending = [(item_id, future) for item_id, future in pending if future.set_running_or_notify_cancel()]
+        ids = list(dict.fromkeys(item_id for item_id, _ in pending))
+        if not ids:
+            return
+        try:
+            results = dict(zip(ids, self.fetch_batch(ids)))
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        for item_id, future in pending:
+            future.set_result(results.get(item_id))
+
+def _details_batch(endpoint: BatchEndpoint, ids: List[str]) -> List[Dict[str, Any]]:
+    """Fetch details for a coalescer, shaped like the single-ID details results."""
     try:
-        response_data = make_request_with_retry(url, params=params, json_data=json_data, method="POST")
-        if isinstance(response_data, list):
-            return [
-                {
-                    "authorId": author.get("authorId"),
-                    "name": author.get("name"),
-                    "url": author.get("url"),
-                    "affiliations": author.get("affiliations"),
-                    "paperCount": author.get("paperCount"),
-                    "citationCount": author.get("citationCount"),
-                    "hIndex": author.get("hIndex")
-                } for author in response_data if author  # Filter out None entries
-            ]
-        else:
-            return []
-    except Exception as e:
-        logger.error(f"Error getting authors batch: {e}")
-        return []
+        items = _fetch_batch(endpoint.url, ids, endpoint.fields)
+    except _API_ERRORS as e:
+        return details_failed(endpoint, ids, e)
+    _cache_set_many(_details_cache_entries(endpoint, ids, items))
+    return shape_details(endpoint, items)
+
+def _submit_details(coalescer: "BatchCoalescer", endpoint: BatchEndpoint, item_id: str) -> Future:
+    """Answer from the response cache when it holds a fresh entry, otherwise queue item_id on coalescer."""
+    entry = _cache_get(_details_cache_key(endpoint, item_id))
+    if entry is not None and entry[0] > time.time():
+        future: Future = Future()
+        future.set_result(endpoint.project(entry[1]))
+        return future
+    return coalescer.submit(item_id)
+
+_paper_coalescer = BatchCoalescer(functools.partial(_details_batch, PAPER_BATCH), max_batch=MAX_PAPER_BATCH,
+                                  name="s2-paper-batch")
+_author_coalescer = BatchCoalescer(functools.partial(_details_batch, AUTHOR_BATCH), max_batch=MAX_AUTHOR_BATCH,
+                                   name="s2-author-batch")
+
+def get_paper_details_coalesced(paper_id: str) -> Future:
+    """Get details of a paper through the response cache or the shared batch coalescer; returns a Future."""
+    return _submit_details(_paper_coalescer, PAPER_BATCH, paper_id)
+
+def get_author_details_coalesced(author_id: str) -> Future:
+    """Get details of an author through the response cache or the shared batch coalescer; returns a Future."""
+    return _submit_details(_author_coalescer, AUTHOR_BATCH, author_id)
 
 def search_snippets(query: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Search for text snippets from papers."""
-    url = f"{BASE_URL}/snippet/search"
-    params = {
-        "query": query,
-        "limit": min(limit, 1000),  # API limit is 1000
-        "fields": "snippet.text,snippet.snippetKind,snippet.section,snippet.snippetOffset"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params)
-        data = response_data.get("data", [])
-        
-        return [
-            {
-                "score": item.get("score"),
-                "snippet": {
-                    "text": item.get("snippet", {}).get("text"),
-                    "snippetKind": item.get("snippet", {}).get("snippetKind"),
-                    "section": item.get("snippet", {}).get("section"),
-                    "snippetOffset": item.get("snippet", {}).get("snippetOffset")
-                },
-                "paper": {
-                    "corpusId": item.get("paper", {}).get("corpusId"),
-                    "title": item.get("paper", {}).get("title"),
-                    "authors": item.get("paper", {}).get("authors", [])
-                }
-            } for item in data
-        ]
-    except Exception as e:
-        logger.error(f"Error searching snippets: {e}")
-        return []
+    return _call(search_snippets_call(query, limit))
 
-def get_paper_recommendations_from_lists(positive_paper_ids: List[str], negative_paper_ids: List[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+def get_paper_recommendations_from_lists(positive_paper_ids: List[str], negative_paper_ids: Optional[List[str]] = None, limit: int = 10) -> List[Dict[str, Any]]:
     """Get recommended papers based on lists of positive and negative example papers."""
-    url = f"{BASE_RECOMMENDATION_URL}/papers"
-    
-    # Prepare the request payload
-    payload = {
-        "positivePaperIds": positive_paper_ids
-    }
-    
-    if negative_paper_ids:
-        payload["negativePaperIds"] = negative_paper_ids
-    
-    params = {
-        "limit": min(limit, 500),
-        "fields": "paperId,corpusId,externalIds,url,title,abstract,venue,publicationVenue,year,referenceCount,citationCount,influentialCitationCount,isOpenAccess,openAccessPdf,fieldsOfStudy,s2FieldsOfStudy,publicationTypes,publicationDate,journal,citationStyles,authors"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params, json_data=payload, method="POST")
-        
-        # Handle response structure with recommendedPapers wrapper
-        papers = response_data.get("recommendedPapers", [])
-        
-        return [
-            {
-                "paperId": paper.get("paperId"),
-                "corpusId": paper.get("corpusId"),
-                "externalIds": paper.get("externalIds"),
-                "url": paper.get("url"),
-                "title": paper.get("title"),
-                "abstract": paper.get("abstract"),
-                "venue": paper.get("venue"),
-                "publicationVenue": paper.get("publicationVenue"),
-                "year": paper.get("year"),
-                "referenceCount": paper.get("referenceCount"),
-                "citationCount": paper.get("citationCount"),
-                "influentialCitationCount": paper.get("influentialCitationCount"),
-                "isOpenAccess": paper.get("isOpenAccess"),
-                "openAccessPdf": paper.get("openAccessPdf"),
-                "fieldsOfStudy": paper.get("fieldsOfStudy"),
-                "s2FieldsOfStudy": paper.get("s2FieldsOfStudy"),
-                "publicationTypes": paper.get("publicationTypes"),
-                "publicationDate": paper.get("publicationDate"),
-                "journal": paper.get("journal"),
-                "citationStyles": paper.get("citationStyles"),
-                "authors": [
-                    {
-                        "authorId": author.get("authorId"),
-                        "name": author.get("name")
-                    } for author in paper.get("authors", [])
-                ]
-            } for paper in papers
-        ]
-    except Exception as e:
-        logger.error(f"Error getting paper recommendations from lists: {e}")
-        return []
+    return _call(recommendations_from_lists_call(positive_paper_ids, negative_paper_ids, limit))
 
 def get_paper_recommendations(paper_id: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Get recommended papers for a single positive example paper."""
-    url = f"{BASE_RECOMMENDATION_URL}/papers/forpaper/{paper_id}"
-    
-    params = {
-        "limit": min(limit, 500),  # API typical limit
-        "fields": "paperId,corpusId,externalIds,url,title,abstract,venue,publicationVenue,year,referenceCount,citationCount,influentialCitationCount,isOpenAccess,openAccessPdf,fieldsOfStudy,s2FieldsOfStudy,publicationTypes,publicationDate,journal,citationStyles,authors"
-    }
-    
-    try:
-        response_data = make_request_with_retry(url, params=params)
-        
-        # Handle response structure with recommendedPapers wrapper
-        papers = response_data.get("recommendedPapers", [])
-        
-        return [
-            {
-                "paperId": paper.get("paperId"),
-                "corpusId": paper.get("corpusId"),
-                "externalIds": paper.get("externalIds"),
-                "url": paper.get("url"),
-                "title": paper.get("title"),
-                "abstract": paper.get("abstract"),
-                "venue": paper.get("venue"),
-                "publicationVenue": paper.get("publicationVenue"),
-                "year": paper.get("year"),
-                "referenceCount": paper.get("referenceCount"),
-                "citationCount": paper.get("citationCount"),
-                "influentialCitationCount": paper.get("influentialCitationCount"),
-                "isOpenAccess": paper.get("isOpenAccess"),
-                "openAccessPdf": paper.get("openAccessPdf"),
-                "fieldsOfStudy": paper.get("fieldsOfStudy"),
-                "s2FieldsOfStudy": paper.get("s2FieldsOfStudy"),
-                "publicationTypes": paper.get("publicationTypes"),
-                "publicationDate": paper.get("publicationDate"),
-                "journal": paper.get("journal"),
-                "citationStyles": paper.get("citationStyles"),
-                "authors": [
-                    {
-                        "authorId": author.get("authorId"),
-                        "name": author.get("name")
-                    } for author in paper.get("authors", [])
-                ]
-            } for paper in papers
-        ]
-    except Exception as e:
-        logger.error(f"Error getting paper recommendations for {paper_id}: {e}")
-        return []
+    return _call(paper_recommendations_call(paper_id, limit))
 
 def main():
     """Test function for the API client."""
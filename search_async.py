@@ -0,0 +1,369 @@
+"""
+Async variants of the Semantic Scholar API client in search.py.
+
+Every endpoint has a *_async counterpart built on a shared httpx.AsyncClient,
+so the MCP server can await API calls on its event loop instead of parking
+them on worker threads, and independent calls can be gathered concurrently.
+URLs, parameters, response shaping and error results come from the same
+builders in endpoints.py as the sync client; only sending differs here.
+When h2 is installed the client speaks HTTP/2, multiplexing those
+concurrent calls over a single connection to api.semanticscholar.org.
+"""
+
+import asyncio
+import functools
+import importlib.util
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from endpoints import (
+    MAX_PAPER_BATCH, MAX_AUTHOR_BATCH, PAPER_BATCH, AUTHOR_BATCH, ApiCall, BatchEndpoint, call_failed,
+    chunked, expand_batch, batch_request, check_batch_response, batch_failed, chunk_failed, shape_details,
+    details_failed, search_papers_call, paper_details_call, author_details_call, paper_citations_call,
+    paper_references_call, search_authors_call, paper_match_call, paper_autocomplete_call, search_snippets_call,
+    recommendations_from_lists_call, paper_recommendations_call
+)
+from search import (
+    DEFAULT_HEADERS, JSON_BODY_HEADERS, MAX_RETRIES, BASE_DELAY, MAX_BATCH_CONCURRENCY, RETRY_STATUSES,
+    _RATE_LIMITER, _json_dumps, _json_loads, _backoff_delay, _retry_after,
+    _CacheEntry, _cache_key, _cache_get, _cache_set, _cache_set_many, _validators, _disk_cache,
+    _details_cache_key, _details_cache_entries
+)
+
+logger = logging.getLogger(__name__)
+
+# Async counterpart of search._API_ERRORS
+_API_ERRORS = (httpx.HTTPError, ValueError, KeyError)
+
+# The on-disk cache does blocking SQLite I/O, so it runs on its own small pool instead of the event loop
+_IO_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("S2_IO_THREADS", "4")), thread_name_prefix="s2-io")
+
+async def _cache_get_async(key: str) -> Optional[_CacheEntry]:
+    """search._cache_get that only leaves the event loop for on-disk lookups."""
+    entry = _cache_get(key, disk=False)
+    if entry is None and _disk_cache is not None:
+        entry = await asyncio.get_running_loop().run_in_executor(_IO_EXECUTOR, _cache_get, key)
+    return entry
+
+async def _cache_set_async(key: str, payload: Any, validators: Optional[Dict[str, str]] = None) -> None:
+    """search._cache_set with the on-disk write moved off the event loop."""
+    if _disk_cache is None:
+        _cache_set(key, payload, validators)
+    else:
+        await asyncio.get_running_loop().run_in_executor(_IO_EXECUTOR, _cache_set, key, payload, validators)
+
+async def _cache_set_many_async(entries: List[Tuple[str, Any]]) -> None:
+    """search._cache_set_many with the on-disk writes moved off the event loop, in one job."""
+    if not entries:
+        return
+    if _disk_cache is None:
+        _cache_set_many(entries)
+    else:
+        await asyncio.get_running_loop().run_in_executor(_IO_EXECUTOR, _cache_set_many, entries)
+
+# Async counterpart of search._BATCH_GATE: every batch POST takes a slot
+_BATCH_SEM = asyncio.BoundedSemaphore(MAX_BATCH_CONCURRENCY)
+
+# HTTP/2 lets concurrent requests share one connection; it needs the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Shared async client, created lazily inside the running event loop
+_client: Optional[httpx.AsyncClient] = None
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=30.0,
+            http2=HTTP2_AVAILABLE,
+            # Every request goes to the same host, so keep idle connections warm well past httpx's 5s default
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=75.0),
+        )
+    return _client
+
+async def close_client() -> None:
+    """Close the shared AsyncClient and release pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def make_request_with_retry_async(url: str, params: Optional[Dict] = None, json_data: Optional[Dict] = None,
+                                        method: str = "GET", max_retries: int = MAX_RETRIES,
+                                        base_delay: float = BASE_DELAY,
+                                        cache: bool = False) -> Dict[str, Any]:
+    """
+    Async counterpart of search.make_request_with_retry.
+
+    Shares the response cache, rate limiter and backoff policy with the sync client.
+    httpx has no status-based retries, so the retry loop lives here.
+
+    Args:
+        url: The URL to make the request to
+        params: Query parameters for GET requests
+        json_data: JSON data for POST requests
+        method: HTTP method (GET or POST)
+        max_retries: Maximum number of retry attempts
+        base_delay: Base delay in seconds, will be exponentially increased
+        cache: Serve from and store into the response cache (read-only endpoints only)
+
+    Returns:
+        JSON response as dictionary
+
+    Raises:
+        httpx.HTTPError: If the request fails, returns a non-retryable status or retries are exhausted
+    """
+    cache_key = _cache_key(method, url, params, json_data) if cache else None
+    entry = await _cache_get_async(cache_key) if cache_key is not None else None
+    if entry is not None and entry[0] > time.time():
+        return entry[1]
+    # A stale entry is only returned when it has validators, so this is a conditional request
+    headers = entry[2] if entry is not None else None
+
+    client = _get_client()
+    for attempt in range(max_retries + 1):
+        delay = _RATE_LIMITER.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        try:
+            if method.upper() == "GET":
+                response = await client.get(url, params=params, headers=headers)
+            elif method.upper() == "POST":
+                response = await client.post(url, params=params, content=_json_dumps(json_data),
+                                             headers=JSON_BODY_HEADERS)
+            else:
+                raise ValueError(f"Unsupported HTTP method: {method}")
+        except httpx.TransportError as e:
+            # Timeouts and connection errors are transient
+            if attempt < max_retries:
+                delay = _backoff_delay(attempt, base_delay)
+                logger.warning("Request failed: %r. Retrying in %.2f seconds... (attempt %s/%s)", e, delay, attempt + 1, max_retries + 1)
+                await asyncio.sleep(delay)
+                continue
+            raise
+        _RATE_LIMITER.update_from_headers(response.headers)
+
+        # Only rate limiting and transient server errors are worth another attempt
+        if response.status_code in RETRY_STATUSES and attempt < max_retries:
+            delay = _backoff_delay(attempt, base_delay)
+            if response.status_code == 429:
+                # Honor Retry-After and hold back other callers too
+                delay = _retry_after(response.headers, delay)
+                _RATE_LIMITER.pause(delay)
+            logger.warning("HTTP %s for %s. Retrying in %.2f seconds... (attempt %s/%s)", response.status_code, url, delay, attempt + 1, max_retries + 1)
+            await asyncio.sleep(delay)
+            continue
+
+        if response.status_code == 304 and entry is not None:
+            # Unchanged upstream: renew the entry without downloading or parsing a body
+            await _cache_set_async(cache_key, entry[1], entry[2])
+            return entry[1]
+
+        # Success, a non-retryable status such as 400/404, or an exhausted retry budget
+        response.raise_for_status()
+        payload = _json_loads(response.content)
+        if cache_key is not None:
+            await _cache_set_async(cache_key, payload, _validators(response.headers))
+        return payload
+
+    raise Exception("Unexpected error in request retry logic")
+
+async def _call_async(call: ApiCall) -> Any:
+    """Async counterpart of search._call."""
+    try:
+        response_data = await make_request_with_retry_async(call.url, params=call.params, json_data=call.json_data,
+                                                            method=call.method, cache=call.cache)
+        return call.parse(response_data)
+    except _API_ERRORS as e:
+        return call_failed(call, e)
+
+async def search_papers_async(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Search for papers using a query string."""
+    return await _call_async(search_papers_call(query, limit))
+
+async def get_paper_details_async(paper_id: str) -> Dict[str, Any]:
+    """Get details of a specific paper."""
+    return await _call_async(paper_details_call(paper_id))
+
+async def get_author_details_async(author_id: str) -> Dict[str, Any]:
+    """Get details of a specific author."""
+    return await _call_async(author_details_call(author_id))
+
+async def get_paper_citations_async(paper_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Get citations for a specific paper."""
+    return await _call_async(paper_citations_call(paper_id, limit))
+
+async def get_paper_references_async(paper_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Get references for a specific paper."""
+    return await _call_async(paper_references_call(paper_id, limit))
+
+async def get_citations_and_references_async(paper_id: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Get citations and references for a paper, fetching both concurrently."""
+    citations, references = await asyncio.gather(
+        get_paper_citations_async(paper_id),
+        get_paper_references_async(paper_id),
+    )
+
+    return {
+        "citations": citations,
+        "references": references
+    }
+
+async def search_authors_async(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Search for authors using a query string."""
+    return await _call_async(search_authors_call(query, limit))
+
+async def search_paper_match_async(query: str) -> Dict[str, Any]:
+    """Find the best matching paper using title-based search."""
+    return await _call_async(paper_match_call(query))
+
+async def get_paper_autocomplete_async(query: str) -> List[Dict[str, Any]]:
+    """Get paper title autocompletion suggestions."""
+    return await _call_async(paper_autocomplete_call(query))
+
+async def _fetch_batch_async(url: str, ids: List[str], fields: str) -> List[Optional[Dict[str, Any]]]:
+    """POST IDs to a batch endpoint. Results line up with ids, with None for unknown IDs."""
+    async with _BATCH_SEM:
+        response_data = await make_request_with_retry_async(url, **batch_request(ids, fields))
+    return check_batch_response(response_data)
+
+async def _fetch_chunk_async(url: str, chunk: List[str], fields: str) -> List[Optional[Dict[str, Any]]]:
+    try:
+        return await _fetch_batch_async(url, chunk, fields)
+    except _API_ERRORS as e:
+        return chunk_failed(url, chunk, e)
+
+async def _fetch_batch_chunked_async(url: str, ids: List[str], fields: str, chunk_size: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    _fetch_batch_async for any number of IDs: larger lists are split into endpoint-sized chunks.
+
+    Chunks are gathered concurrently, each taking its own _BATCH_SEM slot, so a huge list
+    queues behind MAX_BATCH_CONCURRENCY in-flight requests instead of sending them all at once.
+    A chunk whose request fails gets None for each of its IDs; the other chunks are kept.
+    """
+    chunks = chunked(ids, chunk_size)
+    if len(chunks) <= 1:
+        return await _fetch_batch_async(url, ids, fields)
+    results = await asyncio.gather(*(_fetch_chunk_async(url, chunk, fields) for chunk in chunks))
+    return list(itertools.chain.from_iterable(results))
+
+async def _get_batch_async(endpoint: BatchEndpoint, ids: List[str]) -> List[Dict[str, Any]]:
+    """Async counterpart of search._get_batch."""
+    unique_ids = list(dict.fromkeys(ids))
+
+    try:
+        items = await _fetch_batch_chunked_async(endpoint.url, unique_ids, endpoint.fields, endpoint.max_batch)
+        return expand_batch(ids, unique_ids, items, endpoint.project)
+    except _API_ERRORS as e:
+        return batch_failed(endpoint, e)
+
+async def get_papers_batch_async(paper_ids: List[str]) -> List[Dict[str, Any]]:
+    """Get details for multiple papers using batch API, in parallel chunks of up to 500 IDs."""
+    return await _get_batch_async(PAPER_BATCH, paper_ids)
+
+async def get_authors_batch_async(author_ids: List[str]) -> List[Dict[str, Any]]:
+    """Get details for multiple authors using batch API, in parallel chunks of up to 1000 IDs."""
+    return await _get_batch_async(AUTHOR_BATCH, author_ids)
+
+class AsyncBatchCoalescer:
+    """
+    Async counterpart of search.BatchCoalescer.
+
+    IDs submitted within max_wait seconds of the first pending one (or until
+    max_batch distinct IDs are pending) are resolved with a single await of
+    fetch_batch, which must return results aligned with its input. Repeated
+    IDs share one slot. Must be used from a single event loop.
+    """
+
+    def __init__(self, fetch_batch: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]], max_batch: int,
+                 max_wait: float = 0.01):
+        self.fetch_batch = fetch_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, item_id: str) -> asyncio.Future:
+        """Queue an ID and return a Future resolved with its result; await it through asyncio.shield."""
+        future = self._pending.get(item_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[item_id] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_wait, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        # Keep a reference so the task isn't garbage collected mid-flight
+        task = asyncio.ensure_future(self._resolve(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, pending: Dict[str, asyncio.Future]) -> None:
+        ids = list(pending)
+        try:
+            results = dict(zip(ids, await self.fetch_batch(ids)))
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for item_id, future in pending.items():
+            if not future.done():
+                future.set_result(results.get(item_id))
+
+async def _details_batch_async(endpoint: BatchEndpoint, ids: List[str]) -> List[Dict[str, Any]]:
+    """Async counterpart of search._details_batch."""
+    try:
+        items = await _fetch_batch_async(endpoint.url, ids, endpoint.fields)
+    except _API_ERRORS as e:
+        return details_failed(endpoint, ids, e)
+    await _cache_set_many_async(_details_cache_entries(endpoint, ids, items))
+    return shape_details(endpoint, items)
+
+_paper_coalescer = AsyncBatchCoalescer(functools.partial(_details_batch_async, PAPER_BATCH), max_batch=MAX_PAPER_BATCH)
+_author_coalescer = AsyncBatchCoalescer(functools.partial(_details_batch_async, AUTHOR_BATCH), max_batch=MAX_AUTHOR_BATCH)
+
+async def _submit_details_async(coalescer: AsyncBatchCoalescer, endpoint: BatchEndpoint, item_id: str) -> Dict[str, Any]:
+    """Async counterpart of search._submit_details, awaiting the result."""
+    entry = await _cache_get_async(_details_cache_key(endpoint, item_id))
+    if entry is not None and entry[0] > time.time():
+        return endpoint.project(entry[1])
+    return await asyncio.shield(coalescer.submit(item_id))
+
+async def get_paper_details_coalesced_async(paper_id: str) -> Dict[str, Any]:
+    """Get details of a paper from the response cache, or batched with other concurrent lookups into one /paper/batch call."""
+    return await _submit_details_async(_paper_coalescer, PAPER_BATCH, paper_id)
+
+async def get_author_details_coalesced_async(author_id: str) -> Dict[str, Any]:
+    """Get details of an author from the response cache, or batched with other concurrent lookups into one /author/batch call."""
+    return await _submit_details_async(_author_coalescer, AUTHOR_BATCH, author_id)
+
+async def search_snippets_async(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Search for text snippets from papers."""
+    return await _call_async(search_snippets_call(query, limit))
+
+async def get_paper_recommendations_from_lists_async(positive_paper_ids: List[str], negative_paper_ids: Optional[List[str]] = None,
+                                                     limit: int = 10) -> List[Dict[str, Any]]:
+    """Get recommended papers based on lists of positive and negative example papers."""
+    return await _call_async(recommendations_from_lists_call(positive_paper_ids, negative_paper_ids, limit))
+
+async def get_paper_recommendations_async(paper_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Get recommended papers for a single positive example paper."""
+    return await _call_async(paper_recommendations_call(paper_id, limit))
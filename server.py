@@ -6,18 +6,35 @@ Implements the MCP Streamable HTTP transport protocol.
 """
 
 import asyncio
+import hashlib
+import importlib.util
 import logging
 import os
-from typing import Any, Dict, List, Optional
+from typing import Annotated, Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
+import anyio
+from cachetools import TTLCache
 from mcp.server import FastMCP
-from pydantic import BaseModel, Field
+from mcp.types import CallToolResult, TextContent
+from pydantic import Field
 
-from search import (
-    search_papers, get_paper_details, get_author_details, get_citations_and_references,
-    search_authors, search_paper_match, get_paper_autocomplete, get_papers_batch,
-    get_authors_batch, search_snippets, get_paper_recommendations_from_lists,
-    get_paper_recommendations
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:
+    aioredis = None
+    RedisError = OSError
+
+from endpoints import (
+    MAX_SEARCH_LIMIT, MAX_SNIPPET_LIMIT, MAX_RECOMMENDATION_LIMIT, MAX_PAPER_BATCH, MAX_AUTHOR_BATCH, NotFound
+)
+from search import CACHE_TTL, _json_dumps, _json_loads
+from search_async import (
+    search_papers_async, get_paper_details_coalesced_async, get_author_details_coalesced_async,
+    get_citations_and_references_async, search_authors_async, search_paper_match_async,
+    get_paper_autocomplete_async, get_papers_batch_async, get_authors_batch_async,
+    search_snippets_async, get_paper_recommendations_from_lists_async,
+    get_paper_recommendations_async, close_client
 )
 
 # Set up logging
@@ -27,11 +44,134 @@ logger = logging.getLogger(__name__)
 # Initialize the FastMCP server
 app = FastMCP("Semantic Scholar MCP Server")
 
+# Bound how many tool calls hit Semantic Scholar at once, so bursts queue here instead of
+# turning into 429 storms. Batch requests additionally take a slot of search_async._BATCH_SEM
+# each, since batch endpoints have their own, smaller rate bucket.
+_S2_SEM = asyncio.BoundedSemaphore(int(os.getenv("S2_MAX_CONCURRENCY", "10")))
+
+# Longest ID lists the batch tools accept: a few endpoint-sized requests, so a single call
+# can't queue enough batch POSTs to starve the coalesced details lookups behind it
+MAX_PAPER_BATCH_IDS = 4 * MAX_PAPER_BATCH
+MAX_AUTHOR_BATCH_IDS = 4 * MAX_AUTHOR_BATCH
+
+# Shaped results of read-only lookups, so repeat calls skip the request path entirely.
+# Only touched from the event loop with no await between lookup and store, so no lock is needed.
+TOOL_CACHE_SIZE = int(os.getenv("S2_TOOL_CACHE_SIZE", "10000"))
+_paper_cache: TTLCache = TTLCache(maxsize=TOOL_CACHE_SIZE, ttl=CACHE_TTL)
+_author_cache: TTLCache = TTLCache(maxsize=TOOL_CACHE_SIZE, ttl=CACHE_TTL)
+_autocomplete_cache: TTLCache = TTLCache(maxsize=TOOL_CACHE_SIZE, ttl=CACHE_TTL)
+_citations_cache: TTLCache = TTLCache(maxsize=TOOL_CACHE_SIZE, ttl=CACHE_TTL)
+_match_cache: TTLCache = TTLCache(maxsize=TOOL_CACHE_SIZE, ttl=CACHE_TTL)
+
+# Not-found results of by-ID lookups, kept briefly so a client retrying an unknown ID doesn't
+# cost an upstream request each time. Failed requests (timeouts, 5xx, exhausted 429s) are not
+# kept: the next call retries them.
+NEGATIVE_CACHE_TTL = float(os.getenv("S2_NEGATIVE_CACHE_TTL", "60"))
+_failed_lookups: TTLCache = TTLCache(maxsize=TOOL_CACHE_SIZE, ttl=NEGATIVE_CACHE_TTL)
+
+# Optional cache shared by every server process (L2 behind the in-process caches)
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_TIMEOUT = float(os.getenv("S2_REDIS_TIMEOUT", "0.5"))  # A slow Redis counts as a miss, not a stall
+SEARCH_CACHE_TTL = min(CACHE_TTL, 3600.0)  # Search rankings move faster than paper records
+_redis = None
+if REDIS_URL:
+    if aioredis is not None:
+        _redis = aioredis.Redis.from_url(REDIS_URL, socket_connect_timeout=REDIS_TIMEOUT, socket_timeout=REDIS_TIMEOUT)
+    else:
+        logger.warning("REDIS_URL is set but redis is not installed; using in-process caches only")
+
+def _cacheable(result: Any) -> bool:
+    return bool(result) and not (isinstance(result, dict) and "error" in result)
+
+def _remember(cache: TTLCache, key: str, result: Any) -> Any:
+    """Store a tool result in cache and return it. Empty and error results are not cached."""
+    if _cacheable(result) and cache.maxsize > 0:
+        cache[key] = result
+    return result
+
+def _remember_lookup(cache: TTLCache, kind: str, key: str, result: Any) -> Any:
+    """Like _remember, but not-found results go to the short-lived negative cache."""
+    if isinstance(result, NotFound):
+        if NEGATIVE_CACHE_TTL > 0 and _failed_lookups.maxsize > 0:
+            _failed_lookups[(kind, key)] = result
+        return result
+    return _remember(cache, key, result)
+
+async def _shared_get(key: str) -> Optional[Any]:
+    """Look key up in the shared Redis cache; Redis being unavailable or a corrupt value counts as a miss."""
+    if _redis is None:
+        return None
+    try:
+        raw = await _redis.get(key)
+    except RedisError as e:
+        logger.warning("Redis get failed for %s: %s", key, e)
+        return None
+    if raw is None:
+        return None
+    try:
+        return _json_loads(raw)
+    except ValueError as e:
+        logger.warning("Ignoring undecodable Redis value for %s: %s", key, e)
+        return None
+
+async def _shared_set(key: str, result: Any, ttl: float = CACHE_TTL) -> None:
+    """Store a tool result in the shared Redis cache. Empty and error results are not cached."""
+    if _redis is None or ttl <= 0 or not _cacheable(result):
+        return
+    try:
+        await _redis.set(key, _json_dumps(result), ex=int(ttl))
+    except RedisError as e:
+        logger.warning("Redis set failed for %s: %s", key, e)
+
+# In-flight by-ID lookups, so concurrent calls for the same ID share one upstream request
+_inflight: Dict[Tuple[str, str], "asyncio.Task[Any]"] = {}
+
+async def _limited(fetch: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    async with _S2_SEM:
+        return await fetch(*args)
+
+async def _single_flight(key: Tuple[str, str], fetch: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    """
+    Await fetch(*args), joining an identical call that is already in flight.
+
+    The shared call runs as its own task, so a cancelled caller doesn't cancel it for the others.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch(*args))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+async def _fetch_shared(shared_key: str, ttl: float, fetch: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    """Serve fetch(*args) from the shared cache, filling it on a miss."""
+    result = await _shared_get(shared_key)
+    if result is None:
+        result = await fetch(*args)
+        await _shared_set(shared_key, result, ttl)
+    return result
+
+def _tool_result(result: Any) -> CallToolResult:
+    """
+    Build the CallToolResult for a JSON-returning tool, encoding it with orjson.
+
+    Produces what FastMCP would (one text block per list item, or one for an object, plus
+    {"result": ...} as structured content) without its pydantic encoding and the low-level
+    server's jsonschema pass over the whole output, which dominate for hundreds of papers.
+    The tool keeps its List[...]/Dict[...] annotation so the advertised output schema is
+    unchanged.
+    """
+    items = result if isinstance(result, list) else [result]
+    return CallToolResult(
+        content=[TextContent(type="text", text=_json_dumps(item).decode()) for item in items],
+        structuredContent={"result": result},
+    )
+
 # Tool implementations
 @app.tool()
 async def search_semantic_scholar_papers(
     query: str,
-    num_results: int = 10
+    num_results: Annotated[int, Field(ge=1, le=MAX_SEARCH_LIMIT)] = 10
 ) -> List[Dict[str, Any]]:
     """
     Search for papers on Semantic Scholar using a query string.
@@ -43,13 +183,10 @@ async def search_semantic_scholar_papers(
     Returns:
         List of paper objects with details like title, authors, year, abstract, etc.
     """
-    logger.info(f"Searching for papers with query: {query}, num_results: {num_results}")
-    try:
-        results = await asyncio.to_thread(search_papers, query, num_results)
-        return results
-    except Exception as e:
-        logger.error(f"Error searching papers: {e}")
-        raise Exception(f"An error occurred while searching: {str(e)}")
+    logger.info("Searching for papers with query: %s, num_results: %s", query, num_results)
+    key = hashlib.sha1(f"{query.lower()}:{num_results}".encode()).hexdigest()
+    results = await _fetch_shared(f"s2:search:{key}:v1", SEARCH_CACHE_TTL, _limited, search_papers_async, query, num_results)
+    return _tool_result(results)
 
 @app.tool()
 async def get_semantic_scholar_paper_details(
@@ -64,13 +201,14 @@ async def get_semantic_scholar_paper_details(
     Returns:
         Paper object with comprehensive details
     """
-    logger.info(f"Fetching paper details for paper ID: {paper_id}")
-    try:
-        paper = await asyncio.to_thread(get_paper_details, paper_id)
-        return paper
-    except Exception as e:
-        logger.error(f"Error fetching paper details: {e}")
-        raise Exception(f"An error occurred while fetching paper details: {str(e)}")
+    logger.info("Fetching paper details for paper ID: %s", paper_id)
+    cached = _paper_cache.get(paper_id) or _failed_lookups.get(("paper", paper_id))
+    if cached is not None:
+        return _tool_result(cached)
+    # Batched with concurrent lookups into one /paper/batch request, outside the per-call semaphore
+    paper = await _single_flight(("paper", paper_id), _fetch_shared, f"s2:paper:{paper_id}:v1", CACHE_TTL,
+                                 get_paper_details_coalesced_async, paper_id)
+    return _tool_result(_remember_lookup(_paper_cache, "paper", paper_id, paper))
 
 @app.tool()
 async def get_semantic_scholar_author_details(
@@ -85,13 +223,14 @@ async def get_semantic_scholar_author_details(
     Returns:
         Author object with comprehensive details including publications, h-index, etc.
     """
-    logger.info(f"Fetching author details for author ID: {author_id}")
-    try:
-        author = await asyncio.to_thread(get_author_details, author_id)
-        return author
-    except Exception as e:
-        logger.error(f"Error fetching author details: {e}")
-        raise Exception(f"An error occurred while fetching author details: {str(e)}")
+    logger.info("Fetching author details for author ID: %s", author_id)
+    cached = _author_cache.get(author_id) or _failed_lookups.get(("author", author_id))
+    if cached is not None:
+        return _tool_result(cached)
+    # Batched with concurrent lookups into one /author/batch request, outside the per-call semaphore
+    author = await _single_flight(("author", author_id), _fetch_shared, f"s2:author:{author_id}:v1", CACHE_TTL,
+                                 get_author_details_coalesced_async, author_id)
+    return _tool_result(_remember_lookup(_author_cache, "author", author_id, author))
 
 @app.tool()
 async def get_semantic_scholar_citations_and_references(
@@ -106,18 +245,22 @@ async def get_semantic_scholar_citations_and_references(
     Returns:
         Object containing citations and references lists
     """
-    logger.info(f"Fetching citations and references for paper ID: {paper_id}")
-    try:
-        citations_refs = await asyncio.to_thread(get_citations_and_references, paper_id)
-        return citations_refs
-    except Exception as e:
-        logger.error(f"Error fetching citations and references: {e}")
-        raise Exception(f"An error occurred while fetching citations and references: {str(e)}")
+    logger.info("Fetching citations and references for paper ID: %s", paper_id)
+    # Checked before the semaphore, so hits don't queue behind requests that are in flight
+    cached = _citations_cache.get(paper_id)
+    if cached is not None:
+        return _tool_result(cached)
+    citations_refs = await _single_flight(("citations_and_references", paper_id), _limited,
+                                          get_citations_and_references_async, paper_id)
+    # Failed lookups come back as two empty lists, which aren't worth keeping
+    if citations_refs["citations"] or citations_refs["references"]:
+        _remember(_citations_cache, paper_id, citations_refs)
+    return _tool_result(citations_refs)
 
 @app.tool()
 async def search_semantic_scholar_authors(
     query: str,
-    limit: int = 10
+    limit: Annotated[int, Field(ge=1, le=MAX_SEARCH_LIMIT)] = 10
 ) -> List[Dict[str, Any]]:
     """
     Search for authors on Semantic Scholar using a query string.
@@ -129,13 +272,10 @@ async def search_semantic_scholar_authors(
     Returns:
         List of author objects with details
     """
-    logger.info(f"Searching for authors with query: {query}, limit: {limit}")
-    try:
-        results = await asyncio.to_thread(search_authors, query, limit)
-        return results
-    except Exception as e:
-        logger.error(f"Error searching authors: {e}")
-        raise Exception(f"An error occurred while searching authors: {str(e)}")
+    logger.info("Searching for authors with query: %s, limit: %s", query, limit)
+    async with _S2_SEM:
+        results = await search_authors_async(query, limit)
+    return _tool_result(results)
 
 @app.tool()
 async def get_semantic_scholar_paper_match(
@@ -150,18 +290,18 @@ async def get_semantic_scholar_paper_match(
     Returns:
         Best matching paper object
     """
-    logger.info(f"Finding paper match for query: {query}")
-    try:
-        result = await asyncio.to_thread(search_paper_match, query)
-        return result
-    except Exception as e:
-        logger.error(f"Error finding paper match: {e}")
-        raise Exception(f"An error occurred while finding paper match: {str(e)}")
+    logger.info("Finding paper match for query: %s", query)
+    cached = _match_cache.get(query)
+    if cached is not None:
+        return _tool_result(cached)
+    async with _S2_SEM:
+        result = await search_paper_match_async(query)
+    return _tool_result(_remember(_match_cache, query, result))
 
 @app.tool()
 async def get_semantic_scholar_paper_autocomplete(
     query: str
-) -> List[str]:
+) -> List[Dict[str, Any]]:
     """
     Get paper title autocompletion suggestions for a partial query.
     
@@ -169,62 +309,65 @@ async def get_semantic_scholar_paper_autocomplete(
         query: Partial paper title for autocomplete suggestions
     
     Returns:
-        List of autocomplete suggestions
+        List of suggestion objects with the paper id, title and authorsYear
     """
-    logger.info(f"Getting paper autocomplete for query: {query}")
-    try:
-        results = await asyncio.to_thread(get_paper_autocomplete, query)
-        return results
-    except Exception as e:
-        logger.error(f"Error getting autocomplete suggestions: {e}")
-        raise Exception(f"An error occurred while getting autocomplete suggestions: {str(e)}")
+    logger.info("Getting paper autocomplete for query: %s", query)
+    key = query[:100].lower()  # The API only looks at the first 100 characters
+    cached = _autocomplete_cache.get(key)
+    if cached is not None:
+        return _tool_result(cached)
+    async with _S2_SEM:
+        results = await get_paper_autocomplete_async(query)
+    return _tool_result(_remember(_autocomplete_cache, key, results))
 
 @app.tool()
 async def get_semantic_scholar_papers_batch(
-    paper_ids: List[str]
+    paper_ids: Annotated[List[str], Field(max_length=MAX_PAPER_BATCH_IDS)]
 ) -> List[Dict[str, Any]]:
     """
     Get details for multiple papers at once using batch API.
     
     Args:
-        paper_ids: List of paper IDs to fetch
+        paper_ids: List of paper IDs to fetch (max 2000)
     
     Returns:
         List of paper objects
     """
-    logger.info(f"Fetching batch paper details for {len(paper_ids)} papers")
-    try:
-        results = await asyncio.to_thread(get_papers_batch, paper_ids)
-        return results
-    except Exception as e:
-        logger.error(f"Error fetching batch paper details: {e}")
-        raise Exception(f"An error occurred while fetching batch paper details: {str(e)}")
+    logger.info("Fetching batch paper details for %s papers", len(paper_ids))
+    # Details tool results have the same shape, so a fully cached batch needs no request
+    cached = [_paper_cache.get(item_id) for item_id in paper_ids]
+    if None not in cached:
+        return _tool_result(cached)
+    async with _S2_SEM:
+        results = await get_papers_batch_async(paper_ids)
+    return _tool_result(results)
 
 @app.tool()
 async def get_semantic_scholar_authors_batch(
-    author_ids: List[str]
+    author_ids: Annotated[List[str], Field(max_length=MAX_AUTHOR_BATCH_IDS)]
 ) -> List[Dict[str, Any]]:
     """
     Get details for multiple authors at once using batch API.
     
     Args:
-        author_ids: List of author IDs to fetch
+        author_ids: List of author IDs to fetch (max 4000)
     
     Returns:
         List of author objects
     """
-    logger.info(f"Fetching batch author details for {len(author_ids)} authors")
-    try:
-        results = await asyncio.to_thread(get_authors_batch, author_ids)
-        return results
-    except Exception as e:
-        logger.error(f"Error fetching batch author details: {e}")
-        raise Exception(f"An error occurred while fetching batch author details: {str(e)}")
+    logger.info("Fetching batch author details for %s authors", len(author_ids))
+    # Details tool results have the same shape, so a fully cached batch needs no request
+    cached = [_author_cache.get(item_id) for item_id in author_ids]
+    if None not in cached:
+        return _tool_result(cached)
+    async with _S2_SEM:
+        results = await get_authors_batch_async(author_ids)
+    return _tool_result(results)
 
 @app.tool()
 async def search_semantic_scholar_snippets(
     query: str,
-    limit: int = 10
+    limit: Annotated[int, Field(ge=1, le=MAX_SNIPPET_LIMIT)] = 10
 ) -> List[Dict[str, Any]]:
     """
     Search for text snippets from papers that match the query.
@@ -236,43 +379,37 @@ async def search_semantic_scholar_snippets(
     Returns:
         List of snippet objects with context and source paper information
     """
-    logger.info(f"Searching for text snippets with query: {query}, limit: {limit}")
-    try:
-        results = await asyncio.to_thread(search_snippets, query, limit)
-        return results
-    except Exception as e:
-        logger.error(f"Error searching snippets: {e}")
-        raise Exception(f"An error occurred while searching snippets: {str(e)}")
+    logger.info("Searching for text snippets with query: %s, limit: %s", query, limit)
+    async with _S2_SEM:
+        results = await search_snippets_async(query, limit)
+    return _tool_result(results)
 
 @app.tool()
 async def get_semantic_scholar_paper_recommendations_from_lists(
-    positive_paper_ids: List[str],
-    negative_paper_ids: List[str] = [],
-    limit: int = 10
+    positive_paper_ids: Annotated[List[str], Field(min_length=1)],
+    negative_paper_ids: Optional[List[str]] = None,
+    limit: Annotated[int, Field(ge=1, le=MAX_RECOMMENDATION_LIMIT)] = 10,
 ) -> List[Dict[str, Any]]:
     """
     Get recommended papers based on lists of positive and negative example papers.
     
     Args:
         positive_paper_ids: List of positive example paper IDs
-        negative_paper_ids: List of negative example paper IDs
+        negative_paper_ids: Optional list of negative example paper IDs
         limit: Maximum number of recommendations to return
     
     Returns:
         List of recommended paper objects with relevance scores
     """
-    logger.info(f"Getting paper recommendations from lists: {len(positive_paper_ids)} positive, {len(negative_paper_ids)} negative, limit: {limit}")
-    try:
-        results = await asyncio.to_thread(get_paper_recommendations_from_lists, positive_paper_ids, negative_paper_ids or [], limit)
-        return results
-    except Exception as e:
-        logger.error(f"Error getting paper recommendations from lists: {e}")
-        raise Exception(f"An error occurred while getting paper recommendations from lists: {str(e)}")
+    logger.info("Getting paper recommendations from lists: %s positive, %s negative, limit: %s", len(positive_paper_ids), len(negative_paper_ids or ()), limit)
+    async with _S2_SEM:
+        results = await get_paper_recommendations_from_lists_async(positive_paper_ids, negative_paper_ids, limit)
+    return _tool_result(results)
 
 @app.tool()
 async def get_semantic_scholar_paper_recommendations(
     paper_id: str,
-    limit: int = 10
+    limit: Annotated[int, Field(ge=1, le=MAX_RECOMMENDATION_LIMIT)] = 10
 ) -> List[Dict[str, Any]]:
     """
     Get recommended papers for a single positive example paper.
@@ -284,20 +421,28 @@ async def get_semantic_scholar_paper_recommendations(
     Returns:
         List of recommended paper objects with relevance scores
     """
-    logger.info(f"Getting paper recommendations for single paper: {paper_id}, limit: {limit}")
+    logger.info("Getting paper recommendations for single paper: %s, limit: %s", paper_id, limit)
+    async with _S2_SEM:
+        results = await get_paper_recommendations_async(paper_id, limit)
+    return _tool_result(results)
+
+async def serve() -> None:
+    """Run the streamable HTTP server and release shared HTTP clients on shutdown."""
     try:
-        results = await asyncio.to_thread(get_paper_recommendations, paper_id, limit)
-        return results
-    except Exception as e:
-        logger.error(f"Error getting paper recommendations for single paper: {e}")
-        raise Exception(f"An error occurred while getting paper recommendations for single paper: {str(e)}")
+        await app.run_streamable_http_async()
+    finally:
+        await close_client()
+        if _redis is not None:
+            await _redis.aclose()
 
 if __name__ == "__main__":
     # Get configuration from environment variables
     port = int(os.getenv('PORT', 3000))
     host = os.getenv('HOST', '0.0.0.0')
     
-    logger.info(f"Starting Semantic Scholar MCP HTTP Server on {host}:{port}")
+    logger.info("Starting Semantic Scholar MCP HTTP Server on %s:%s", host, port)
     
-    # Run the FastMCP server with streamable HTTP transport
-    app.run(transport="streamable-http")
+    # Run the FastMCP server with streamable HTTP transport, on uvloop when it is installed
+    # (it has no Windows build, so elsewhere the default asyncio loop is used)
+    use_uvloop = importlib.util.find_spec("uvloop") is not None
+    anyio.run(serve, backend_options={"use_uvloop": use_uvloop})
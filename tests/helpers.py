@@ -0,0 +1,31 @@
+import asyncio
+from unittest import mock
+
+import search
+
+
+class RecordingFetch:
+    """fetch_batch stand-in for a batch coalescer: records each call and returns result(id) per ID."""
+
+    def __init__(self, result=lambda item_id: {"id": item_id}):
+        self.result = result
+        self.calls = []
+
+    def __call__(self, ids):
+        self.calls.append(list(ids))
+        return [self.result(item_id) for item_id in ids]
+
+
+class AsyncRecordingFetch(RecordingFetch):
+    """RecordingFetch for AsyncBatchCoalescer, yielding to the event loop once per call."""
+
+    async def __call__(self, ids):
+        await asyncio.sleep(0)
+        return super().__call__(ids)
+
+
+def disable_rate_limiter(test_case):
+    """Don't wait out the module-wide rate limiter between sends for the rest of test_case."""
+    patcher = mock.patch.object(search._RATE_LIMITER, "max_calls", 0)
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
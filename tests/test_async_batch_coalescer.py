@@ -0,0 +1,130 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+import httpx
+
+import search
+import search_async
+from helpers import AsyncRecordingFetch, disable_rate_limiter
+from search_async import AsyncBatchCoalescer
+
+
+class AsyncBatchCoalescerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_flushes_when_max_batch_is_reached(self):
+        fetch = AsyncRecordingFetch()
+        coalescer = AsyncBatchCoalescer(fetch, max_batch=3, max_wait=60.0)
+        futures = [coalescer.submit(item_id) for item_id in ("a", "b", "c")]
+        results = await asyncio.wait_for(asyncio.gather(*futures), 1.0)
+        self.assertEqual(results, [{"id": "a"}, {"id": "b"}, {"id": "c"}])
+        self.assertEqual(fetch.calls, [["a", "b", "c"]])
+
+    async def test_flushes_after_max_wait(self):
+        fetch = AsyncRecordingFetch()
+        coalescer = AsyncBatchCoalescer(fetch, max_batch=100, max_wait=0.01)
+        futures = [coalescer.submit(item_id) for item_id in ("a", "b")]
+        self.assertEqual(fetch.calls, [])
+        self.assertEqual(await asyncio.wait_for(asyncio.gather(*futures), 1.0), [{"id": "a"}, {"id": "b"}])
+        self.assertEqual(fetch.calls, [["a", "b"]])
+
+    async def test_duplicate_ids_share_one_slot(self):
+        fetch = AsyncRecordingFetch()
+        coalescer = AsyncBatchCoalescer(fetch, max_batch=2, max_wait=60.0)
+        first, again = coalescer.submit("a"), coalescer.submit("a")
+        self.assertIs(first, again)
+        # Only distinct IDs count towards max_batch
+        self.assertEqual(fetch.calls, [])
+        second = coalescer.submit("b")
+        self.assertEqual(await asyncio.wait_for(asyncio.gather(first, again, second), 1.0),
+                         [{"id": "a"}, {"id": "a"}, {"id": "b"}])
+        self.assertEqual(fetch.calls, [["a", "b"]])
+
+    async def test_unknown_ids_resolve_to_none(self):
+        fetch = AsyncRecordingFetch(lambda item_id: None if item_id == "bad" else {"id": item_id})
+        coalescer = AsyncBatchCoalescer(fetch, max_batch=100, max_wait=0.01)
+        futures = [coalescer.submit(item_id) for item_id in ("a", "bad", "b")]
+        self.assertEqual(await asyncio.gather(*futures), [{"id": "a"}, None, {"id": "b"}])
+
+    async def test_fetch_error_fails_every_pending_lookup(self):
+        async def fetch(ids):
+            raise RuntimeError("boom")
+
+        coalescer = AsyncBatchCoalescer(fetch, max_batch=100, max_wait=0.01)
+        futures = [coalescer.submit(item_id) for item_id in ("a", "b")]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+
+class CoalescedDetailsTest(unittest.IsolatedAsyncioTestCase):
+    """Coalesced detail lookups end to end, against httpx.MockTransport."""
+
+    async def asyncSetUp(self):
+        search.api_cache_clear()
+        self.addCleanup(search.api_cache_clear)
+        self.posted = []
+        self.in_flight = 0
+        self.peak = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        search_async._client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        patcher = mock.patch.object(search_async, "_BATCH_SEM", asyncio.BoundedSemaphore(1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        disable_rate_limiter(self)
+
+    async def asyncTearDown(self):
+        await search_async.close_client()
+
+    async def handle(self, request):
+        ids = json.loads(request.content)["ids"]
+        self.posted.append(ids)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await self.release.wait()
+        self.in_flight -= 1
+        return httpx.Response(200, json=[None if item_id.startswith("bad") else {"paperId": item_id, "title": "T"}
+                                         for item_id in ids])
+
+    async def test_concurrent_lookups_share_one_batch_request(self):
+        results = await asyncio.gather(*(search_async.get_paper_details_coalesced_async(item_id)
+                                         for item_id in ("p2", "bad", "p1", "p2")))
+        self.assertEqual(self.posted, [["p2", "bad", "p1"]])
+        self.assertEqual([result.get("paperId") for result in results], ["p2", None, "p1", "p2"])
+        self.assertEqual(results[1], {"error": "Failed to get paper details: paper not found"})
+
+    async def test_found_details_are_served_from_the_response_cache(self):
+        first = await search_async.get_paper_details_coalesced_async("p1")
+        self.assertEqual(await search_async.get_paper_details_coalesced_async("p1"), first)
+        self.assertEqual(self.posted, [["p1"]])
+        # Unknown IDs are not cached
+        await search_async.get_paper_details_coalesced_async("bad")
+        await search_async.get_paper_details_coalesced_async("bad")
+        self.assertEqual(self.posted, [["p1"], ["bad"], ["bad"]])
+
+    async def test_cancelled_caller_does_not_cancel_the_flush(self):
+        self.release.clear()
+        cancelled = asyncio.ensure_future(search_async.get_paper_details_coalesced_async("p1"))
+        kept = asyncio.ensure_future(search_async.get_paper_details_coalesced_async("p1"))
+        while not self.posted:
+            await asyncio.sleep(0.005)
+        cancelled.cancel()
+        self.release.set()
+        self.assertEqual((await kept)["paperId"], "p1")
+        self.assertTrue(cancelled.cancelled())
+        self.assertEqual(self.posted, [["p1"]])
+
+    async def test_flushes_take_the_batch_semaphore(self):
+        self.release.clear()
+        with mock.patch.object(search_async._paper_coalescer, "max_batch", 1):
+            lookups = asyncio.gather(*(search_async.get_paper_details_coalesced_async(f"p{i}") for i in range(3)))
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(self.posted), 1)
+            self.release.set()
+            await lookups
+        self.assertEqual(len(self.posted), 3)
+        self.assertEqual(self.peak, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
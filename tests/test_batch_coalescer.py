@@ -0,0 +1,133 @@
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+import search
+from endpoints import PAPER_BATCH
+from helpers import RecordingFetch
+from search import BatchCoalescer
+
+
+class FakeBatchSender:
+    """Stands in for make_request_with_retry on the batch endpoints, recording the posted IDs."""
+
+    def __init__(self, known):
+        self.known = known
+        self.posted = []
+        self._lock = threading.Lock()
+
+    def __call__(self, url, params=None, json_data=None, method="GET", cache=False):
+        with self._lock:
+            self.posted.append(list(json_data["ids"]))
+        return [{"paperId": item_id, "authorId": item_id} if item_id in self.known else None
+                for item_id in json_data["ids"]]
+
+
+class BatchCoalescerTest(unittest.TestCase):
+    def test_flushes_when_max_batch_is_reached(self):
+        fetch = RecordingFetch()
+        # The wait is far longer than the test, so only the batch size can trigger the flush
+        coalescer = BatchCoalescer(fetch, max_batch=3, max_wait=60.0)
+        futures = [coalescer.submit(item_id) for item_id in ("a", "b", "c")]
+        self.assertEqual([future.result(timeout=1.0) for future in futures],
+                         [{"id": "a"}, {"id": "b"}, {"id": "c"}])
+        self.assertEqual(fetch.calls, [["a", "b", "c"]])
+
+    def test_flushes_after_max_wait(self):
+        fetch = RecordingFetch()
+        coalescer = BatchCoalescer(fetch, max_batch=100, max_wait=0.05)
+        futures = [coalescer.submit(item_id) for item_id in ("a", "b")]
+        self.assertEqual([future.result(timeout=1.0) for future in futures], [{"id": "a"}, {"id": "b"}])
+        self.assertEqual(fetch.calls, [["a", "b"]])
+
+    def test_duplicate_ids_share_one_slot(self):
+        fetch = RecordingFetch()
+        coalescer = BatchCoalescer(fetch, max_batch=100, max_wait=0.05)
+        futures = [coalescer.submit(item_id) for item_id in ("a", "b", "a")]
+        self.assertEqual([future.result(timeout=1.0) for future in futures],
+                         [{"id": "a"}, {"id": "b"}, {"id": "a"}])
+        self.assertEqual(fetch.calls, [["a", "b"]])
+
+    def test_unknown_ids_resolve_to_none(self):
+        fetch = RecordingFetch(lambda item_id: None if item_id == "bad" else {"id": item_id})
+        coalescer = BatchCoalescer(fetch, max_batch=100, max_wait=0.05)
+        futures = [coalescer.submit(item_id) for item_id in ("a", "bad", "b")]
+        self.assertEqual([future.result(timeout=1.0) for future in futures], [{"id": "a"}, None, {"id": "b"}])
+
+    def test_fetch_error_fails_every_pending_lookup(self):
+        def fetch(ids):
+            raise RuntimeError("boom")
+
+        coalescer = BatchCoalescer(fetch, max_batch=100, max_wait=0.05)
+        futures = [coalescer.submit(item_id) for item_id in ("a", "b")]
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=1.0)
+
+    def test_cancelled_lookup_is_left_out_of_the_batch(self):
+        fetch = RecordingFetch()
+        coalescer = BatchCoalescer(fetch, max_batch=100, max_wait=0.05)
+        cancelled = coalescer.submit("a")
+        kept = coalescer.submit("b")
+        self.assertTrue(cancelled.cancel())
+        self.assertEqual(kept.result(timeout=1.0), {"id": "b"})
+        self.assertEqual(fetch.calls, [["b"]])
+
+
+class CoalescedDetailsTest(unittest.TestCase):
+    def setUp(self):
+        search.api_cache_clear()
+        self.addCleanup(search.api_cache_clear)
+        self.sender = FakeBatchSender(known={"p1", "p2"})
+        patcher = mock.patch.object(search, "make_request_with_retry", self.sender)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_details_keep_input_order_with_errors_for_unknown_ids(self):
+        results = search._details_batch(PAPER_BATCH, ["p2", "bad", "p1"])
+        self.assertEqual([result.get("paperId") for result in results], ["p2", None, "p1"])
+        self.assertEqual(results[1], {"error": "Failed to get paper details: paper not found"})
+
+    def test_coalesced_lookup_is_served_from_the_response_cache_afterwards(self):
+        first = search.get_paper_details_coalesced("p1").result(timeout=1.0)
+        self.assertEqual(first["paperId"], "p1")
+        second = search.get_paper_details_coalesced("p1")
+        self.assertTrue(second.done())
+        self.assertEqual(second.result(), first)
+        self.assertEqual(self.sender.posted, [["p1"]])
+
+
+class GetBatchTest(unittest.TestCase):
+    def test_duplicate_and_unknown_ids(self):
+        sender = FakeBatchSender(known={"a", "b"})
+        with mock.patch.object(search, "make_request_with_retry", sender):
+            results = search.get_papers_batch(["a", "bad", "b", "a"])
+        # Each distinct ID is posted once; unknown IDs are skipped and duplicates repeat in place
+        self.assertEqual(sender.posted, [["a", "bad", "b"]])
+        self.assertEqual([paper["paperId"] for paper in results], ["a", "b", "a"])
+
+    def test_chunks_are_reassembled_in_input_order(self):
+        sender = FakeBatchSender(known={str(i) for i in range(7)})
+        ids = [str(i) for i in range(7)]
+        with mock.patch.object(search, "make_request_with_retry", sender):
+            items = search._fetch_batch_chunked(PAPER_BATCH.url, ids, "title", chunk_size=3)
+        self.assertEqual(sorted(sender.posted), [["0", "1", "2"], ["3", "4", "5"], ["6"]])
+        self.assertEqual([item["paperId"] for item in items], ids)
+
+    def test_failed_chunk_keeps_the_other_chunks(self):
+        sender = FakeBatchSender(known={str(i) for i in range(7)})
+
+        def send(url, **kwargs):
+            if "3" in kwargs["json_data"]["ids"]:
+                raise requests.HTTPError("400 Client Error")
+            return sender(url, **kwargs)
+
+        with mock.patch.object(search, "make_request_with_retry", send):
+            items = search._fetch_batch_chunked(PAPER_BATCH.url, [str(i) for i in range(7)], "title", chunk_size=3)
+        self.assertEqual([item and item["paperId"] for item in items], ["0", "1", "2", None, None, None, "6"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+import httpx
+
+import search
+import search_async
+import server
+from helpers import disable_rate_limiter
+
+
+class NegativeCacheTest(unittest.IsolatedAsyncioTestCase):
+    """Paper details tool results for unknown IDs and failed requests, against httpx.MockTransport."""
+
+    async def asyncSetUp(self):
+        search.api_cache_clear()
+        self.addCleanup(search.api_cache_clear)
+        for cache in (server._paper_cache, server._failed_lookups):
+            cache.clear()
+            self.addCleanup(cache.clear)
+        self.posted = []
+        self.status = 200
+        search_async._client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        for name, value in (("_BATCH_SEM", asyncio.BoundedSemaphore(2)), ("_backoff_delay", lambda *args: 0)):
+            patcher = mock.patch.object(search_async, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        disable_rate_limiter(self)
+
+    async def asyncTearDown(self):
+        await search_async.close_client()
+
+    def handle(self, request):
+        ids = json.loads(request.content)["ids"]
+        self.posted.append(ids)
+        if self.status != 200:
+            return httpx.Response(self.status)
+        return httpx.Response(200, json=[None if item_id.startswith("bad") else {"paperId": item_id, "title": "T"}
+                                         for item_id in ids])
+
+    async def details(self, paper_id):
+        result = await server.get_semantic_scholar_paper_details(paper_id)
+        return result.structuredContent["result"]
+
+    async def test_unknown_id_is_negatively_cached(self):
+        first = await self.details("bad")
+        self.assertEqual(first, {"error": "Failed to get paper details: paper not found"})
+        self.assertEqual(await self.details("bad"), first)
+        self.assertEqual(self.posted, [["bad"]])
+
+    async def test_failed_request_is_retried_on_the_next_call(self):
+        self.status = 503
+        failed = await self.details("p1")
+        self.assertIn("error", failed)
+        self.assertNotIn(("paper", "p1"), server._failed_lookups)
+        self.status = 200
+        self.assertEqual((await self.details("p1"))["paperId"], "p1")
+        self.assertEqual(self.posted[-1], ["p1"])
+        self.assertEqual(len(self.posted), search.MAX_RETRIES + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
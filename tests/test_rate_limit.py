@@ -0,0 +1,117 @@
+import threading
+import unittest
+from unittest import mock
+
+import search
+from search import AIMDLimiter, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(search.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reserve_spaces_sends_over_the_window(self):
+        limiter = RateLimiter(2, period=10.0)
+        self.assertEqual(limiter.reserve(), 0.0)
+        self.assertEqual(limiter.reserve(), 0.0)
+        # The third send has to wait until the first one leaves the window
+        self.assertEqual(limiter.reserve(), 10.0)
+        self.assertEqual(limiter.reserve(), 10.0)
+        self.assertEqual(limiter.reserve(), 20.0)
+
+    def test_reserve_frees_slots_as_time_passes(self):
+        limiter = RateLimiter(2, period=10.0)
+        limiter.reserve()
+        limiter.reserve()
+        self.clock.now += 10.0
+        self.assertEqual(limiter.reserve(), 0.0)
+
+    def test_pause_holds_back_every_send(self):
+        limiter = RateLimiter(100, period=60.0)
+        limiter.pause(5.0)
+        self.assertEqual(limiter.reserve(), 5.0)
+        # A shorter pause never shortens an existing one
+        limiter.pause(1.0)
+        self.assertEqual(limiter.reserve(), 5.0)
+
+    def test_update_from_headers_pauses_on_exhausted_quota(self):
+        limiter = RateLimiter(100, period=60.0)
+        limiter.update_from_headers({"x-ratelimit-remaining": "3", "x-ratelimit-reset": "7"})
+        self.assertEqual(limiter.reserve(), 0.0)
+        limiter.update_from_headers({"x-ratelimit-remaining": "0", "x-ratelimit-reset": "7"})
+        self.assertEqual(limiter.reserve(), 7.0)
+        limiter.update_from_headers({"x-ratelimit-remaining": "0", "x-ratelimit-reset": "soon"})
+        self.assertEqual(limiter.reserve(), 60.0)
+
+    def test_spaced_limiter_never_bursts(self):
+        limiter = RateLimiter.spaced(60)
+        self.assertEqual([limiter.reserve() for _ in range(3)], [0.0, 1.0, 2.0])
+        self.clock.now += 10.0
+        self.assertEqual(limiter.reserve(), 0.0)
+        self.assertEqual(RateLimiter.spaced(0).reserve(), 0.0)
+
+    def test_disabled_limiter_never_waits(self):
+        limiter = RateLimiter(0)
+        limiter.pause(30.0)
+        self.assertEqual([limiter.reserve() for _ in range(5)], [0.0] * 5)
+
+
+class AIMDLimiterTest(unittest.TestCase):
+    def test_record_adjusts_limit_within_bounds(self):
+        limiter = AIMDLimiter(initial=4, minimum=1, maximum=5, increase=0.5, decrease=0.5)
+        limiter.record(throttled=True)
+        self.assertEqual(limiter.limit, 2.0)
+        for _ in range(3):
+            limiter.record(throttled=True)
+        self.assertEqual(limiter.limit, 1)
+        for _ in range(20):
+            limiter.record(throttled=False)
+        self.assertEqual(limiter.limit, 5)
+
+    def test_acquire_blocks_at_the_limit_until_release(self):
+        limiter = AIMDLimiter(initial=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=waiter, daemon=True)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        limiter.release()
+        self.assertTrue(acquired.wait(1.0))
+        limiter.release()
+        thread.join(1.0)
+
+    def test_growing_limit_wakes_waiters(self):
+        limiter = AIMDLimiter(initial=1, increase=1.0)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=waiter, daemon=True)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        limiter.record(throttled=False)
+        self.assertTrue(acquired.wait(1.0))
+        thread.join(1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
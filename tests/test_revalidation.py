@@ -0,0 +1,97 @@
+import time
+import unittest
+from unittest import mock
+
+import httpx
+import requests
+
+import search
+import search_async
+from endpoints import paper_details_call
+from helpers import disable_rate_limiter
+
+URL = paper_details_call("p1").url
+PARAMS = {"fields": "title"}
+PAYLOAD = {"paperId": "p1", "title": "T"}
+
+
+def expire(key):
+    """Age a cached entry past its TTL, keeping its payload and validators."""
+    _, payload, validators = search._memory_cache[key]
+    search._memory_cache[key] = (time.time() - 1, payload, validators)
+
+
+def make_response(status, body=None, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = search._json_dumps(body) if body is not None else b""
+    return response
+
+
+class SyncRevalidationTest(unittest.TestCase):
+    def setUp(self):
+        search.api_cache_clear()
+        self.addCleanup(search.api_cache_clear)
+        self.key = search._cache_key("GET", URL, PARAMS, None)
+        disable_rate_limiter(self)
+
+    def test_304_renews_the_entry_without_a_body(self):
+        sent = []
+        responses = [make_response(200, PAYLOAD, {"ETag": '"v1"'}), make_response(304)]
+
+        def send(method, url, params, json_data, headers=None):
+            sent.append(headers)
+            return responses.pop(0)
+
+        with mock.patch.object(search, "_send", send):
+            self.assertEqual(search.make_request_with_retry(URL, params=PARAMS, cache=True), PAYLOAD)
+            expire(self.key)
+            self.assertEqual(search.make_request_with_retry(URL, params=PARAMS, cache=True), PAYLOAD)
+            # Renewed, so the next call is a plain cache hit
+            self.assertEqual(search.make_request_with_retry(URL, params=PARAMS, cache=True), PAYLOAD)
+
+        self.assertEqual(sent, [None, {"If-None-Match": '"v1"'}])
+        expires_at, payload, validators = search._memory_cache[self.key]
+        self.assertGreater(expires_at, time.time())
+        self.assertEqual(validators, {"If-None-Match": '"v1"'})
+
+    def test_expired_entry_without_validators_is_dropped(self):
+        search._cache_set(self.key, PAYLOAD)
+        expire(self.key)
+        self.assertIsNone(search._cache_get(self.key))
+
+
+class AsyncRevalidationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        search.api_cache_clear()
+        self.addCleanup(search.api_cache_clear)
+        self.key = search._cache_key("GET", URL, PARAMS, None)
+        disable_rate_limiter(self)
+        self.requests = []
+        search_async._client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    async def asyncTearDown(self):
+        await search_async.close_client()
+
+    def handle(self, request):
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json=PAYLOAD, headers={"ETag": '"v1"', "Last-Modified": "Mon, 05 Oct 2026 00:00:00 GMT"})
+
+    async def test_304_renews_the_entry_without_a_body(self):
+        self.assertEqual(await search_async.make_request_with_retry_async(URL, params=PARAMS, cache=True), PAYLOAD)
+        expire(self.key)
+        self.assertEqual(await search_async.make_request_with_retry_async(URL, params=PARAMS, cache=True), PAYLOAD)
+        self.assertEqual(await search_async.make_request_with_retry_async(URL, params=PARAMS, cache=True), PAYLOAD)
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertNotIn("If-None-Match", self.requests[0].headers)
+        self.assertEqual(self.requests[1].headers["If-None-Match"], '"v1"')
+        self.assertEqual(self.requests[1].headers["If-Modified-Since"], "Mon, 05 Oct 2026 00:00:00 GMT")
+        self.assertGreater(search._memory_cache[self.key][0], time.time())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+
+import server
+
+
+class SlowFetch:
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self, item_id):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {"id": item_id}
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_share_one_fetch(self):
+        fetch = SlowFetch()
+        first = asyncio.ensure_future(server._single_flight(("paper", "a"), fetch, "a"))
+        second = asyncio.ensure_future(server._single_flight(("paper", "a"), fetch, "a"))
+        await asyncio.sleep(0)
+        fetch.release.set()
+        self.assertEqual(await asyncio.gather(first, second), [{"id": "a"}, {"id": "a"}])
+        self.assertEqual(fetch.calls, 1)
+        self.assertNotIn(("paper", "a"), server._inflight)
+
+    async def test_cancelled_caller_does_not_cancel_the_shared_lookup(self):
+        fetch = SlowFetch()
+        cancelled = asyncio.ensure_future(server._single_flight(("paper", "b"), fetch, "b"))
+        kept = asyncio.ensure_future(server._single_flight(("paper", "b"), fetch, "b"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await cancelled
+        fetch.release.set()
+        self.assertEqual(await kept, {"id": "b"})
+        self.assertFalse(fetch.cancelled)
+        self.assertEqual(fetch.calls, 1)
+
+    async def test_lookup_survives_when_every_caller_is_cancelled(self):
+        fetch = SlowFetch()
+        caller = asyncio.ensure_future(server._single_flight(("paper", "c"), fetch, "c"))
+        await asyncio.sleep(0)
+        task = server._inflight[("paper", "c")]
+        caller.cancel()
+        fetch.release.set()
+        self.assertEqual(await task, {"id": "c"})
+        self.assertFalse(fetch.cancelled)
+
+    async def test_finished_lookup_is_not_reused(self):
+        fetch = SlowFetch()
+        fetch.release.set()
+        await server._single_flight(("paper", "d"), fetch, "d")
+        await server._single_flight(("paper", "d"), fetch, "d")
+        self.assertEqual(fetch.calls, 2)
+
+    async def test_errors_reach_every_caller(self):
+        async def fail(item_id):
+            await asyncio.sleep(0)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            server._single_flight(("paper", "e"), fail, "e"),
+            server._single_flight(("paper", "e"), fail, "e"),
+            return_exceptions=True,
+        )
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertNotIn(("paper", "e"), server._inflight)
+
+
+if __name__ == "__main__":
+    unittest.main()